@@ -1,4 +1,6 @@
 from app import create_app, db
+from app.utils.rank_index import rank_engine
+from app.utils.quantiles import run_sketches
 import ssl
 
 app = create_app()
@@ -6,6 +8,8 @@ app = create_app()
 if __name__ == '__main__':
     with app.app_context():
         db.create_all()
+        rank_engine.warm()
+        run_sketches.warm()
 
     # cert_file = "ssl_cert.pem"
     # key_file = "ssl_key.pem"
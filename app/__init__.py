@@ -1,21 +1,75 @@
+from datetime import timedelta
 from flask import Flask
 from flask_sqlalchemy import SQLAlchemy
 from flask_bcrypt import Bcrypt
 from flask_cors import CORS
-from config import DB_USER, DB_PASSWORD, DB_HOST, DB_PORT, DB_NAME
+from config import (
+    DATABASE_URL, DB_REPLICA_URLS, DB_POOL_SIZE, DB_MAX_OVERFLOW, DB_POOL_TIMEOUT, DB_POOL_RECYCLE,
+    DB_STATEMENT_TIMEOUT, DB_STICKY_SECONDS, BCRYPT_ROUNDS, HASH_WORKERS, SLOW_REQUEST_MS, METRICS_TOKEN,
+    ACCESS_TOKEN_MINUTES, REFRESH_TOKEN_DAYS, IDEMPOTENCY_TTL, IDEMPOTENCY_MAX_MB, IDEMPOTENCY_DB
+)
+from app.db_routing import RoutingSession, REPLICA_PREFIX, STICKY_HEADER, sticky_writers
+from app.metrics import metrics, TimedQueuePool
 
-db = SQLAlchemy()
+db = SQLAlchemy(session_options={'class_': RoutingSession})
 bcrypt = Bcrypt()
 
+
+def _engine_options(url):
+    options = {'pool_pre_ping': True, 'pool_recycle': DB_POOL_RECYCLE}
+    if not url.startswith('sqlite'):
+        options.update(poolclass=TimedQueuePool, pool_size=DB_POOL_SIZE, max_overflow=DB_MAX_OVERFLOW, pool_timeout=DB_POOL_TIMEOUT)
+    if url.startswith('postgresql'):
+        options['connect_args'] = {'options': f'-c statement_timeout={DB_STATEMENT_TIMEOUT}'}
+    return options
+
+
 def create_app():
     app = Flask(__name__)
-    CORS(app)
+    CORS(app, expose_headers=[STICKY_HEADER])
     app.config['SECRET_KEY'] = 'secret'
-    app.config['SQLALCHEMY_DATABASE_URI'] = f'postgresql://{DB_USER}:{DB_PASSWORD}@{DB_HOST}:{DB_PORT}/{DB_NAME}'
+    app.config['ACCESS_TOKEN_LIFETIME'] = timedelta(minutes=ACCESS_TOKEN_MINUTES)
+    app.config['REFRESH_TOKEN_LIFETIME'] = timedelta(days=REFRESH_TOKEN_DAYS)
+    app.config['SQLALCHEMY_DATABASE_URI'] = DATABASE_URL
+    app.config['SQLALCHEMY_ENGINE_OPTIONS'] = _engine_options(DATABASE_URL)
+    app.config['SQLALCHEMY_BINDS'] = {
+        f'{REPLICA_PREFIX}{i}': {'url': url, **_engine_options(url)} for i, url in enumerate(DB_REPLICA_URLS)
+    }
     app.config['SQLALCHEMY_TRACK_MODIFICATIONS'] = False
+    app.config['DB_STICKY_SECONDS'] = DB_STICKY_SECONDS
+    app.config['BCRYPT_LOG_ROUNDS'] = BCRYPT_ROUNDS
+    app.config['HASH_WORKERS'] = HASH_WORKERS
+    app.config['SLOW_REQUEST_MS'] = SLOW_REQUEST_MS
+    app.config['METRICS_TOKEN'] = METRICS_TOKEN
+    app.config['IDEMPOTENCY_TTL'] = IDEMPOTENCY_TTL
+    app.config['IDEMPOTENCY_MAX_BYTES'] = IDEMPOTENCY_MAX_MB * 1024 * 1024
+    app.config['IDEMPOTENCY_DB'] = IDEMPOTENCY_DB
     
     db.init_app(app)
     bcrypt.init_app(app)
+    metrics.init_app(app)
+    sticky_writers.init_app(app)
+
+    from app.utils.passwords import password_hasher
+    password_hasher.init_app(app)
+
+    from app.utils.coins import ledger_writer
+    ledger_writer.init_app(app)
+
+    from app.utils.records import run_history
+    run_history.init_app(app)
+
+    from app.utils.quantiles import run_sketches
+    run_sketches.init_app(app)
+
+    from app.utils.broadcaster import leaderboard_broadcaster
+    leaderboard_broadcaster.init_app(app)
+
+    from app.utils.idempotency import idempotency_store
+    idempotency_store.init_app(app)
+
+    from app.utils.revocation import revocation_list
+    revocation_list.init_app(app)
     
     from app.routes.auth import auth_bp
     from app.routes.game import game_bp
@@ -24,5 +78,8 @@ def create_app():
     app.register_blueprint(auth_bp)
     app.register_blueprint(game_bp)
     app.register_blueprint(admin_bp)
+
+    from app.commands import register_commands
+    register_commands(app)
     
     return app 
\ No newline at end of file
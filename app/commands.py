@@ -0,0 +1,294 @@
+import csv
+import datetime
+import json
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+from itertools import islice
+import click
+from flask import current_app
+from flask.cli import with_appcontext
+from sqlalchemy import and_, column, delete, exists, insert, inspect, or_, select, table, text
+from sqlalchemy.exc import DataError, IntegrityError
+from app import db
+from app.models import User, Background, UserBackground, PeriodBoard, Leaderboard
+from app.utils.email import generate_verification_code, send_verification, mailer
+from app.utils.passwords import hash_password
+from app.utils.upsert import dialect_insert
+
+
+def register_commands(app):
+    app.cli.add_command(migrate_leaderboard)
+    app.cli.add_command(migrate_backgrounds)
+    app.cli.add_command(seed_backgrounds)
+    app.cli.add_command(import_users)
+    app.cli.add_command(prune_boards)
+
+
+@click.command('migrate-leaderboard')
+@with_appcontext
+def migrate_leaderboard():
+    """Keep one best row per (user_id, difficulty) and add the indexes new_record relies on."""
+    # create_all не меняет существующие таблицы, а ON CONFLICT (user_id, difficulty) без уникального индекса падает
+    indexes = {index['name'] for index in inspect(db.engine).get_indexes('leaderboard')}
+    indexes |= {constraint['name'] for constraint in inspect(db.engine).get_unique_constraints('leaderboard')}
+
+    removed = 0
+    if 'uq_leaderboard_user_difficulty' not in indexes:
+        leaderboard = Leaderboard.__table__
+        faster = leaderboard.alias('faster')
+        # оставляем самый быстрый забег, при равном времени — более ранний id
+        result = db.session.execute(delete(leaderboard).where(exists().where(
+            faster.c.user_id == leaderboard.c.user_id,
+            faster.c.difficulty == leaderboard.c.difficulty,
+            or_(
+                faster.c.milliseconds < leaderboard.c.milliseconds,
+                and_(faster.c.milliseconds == leaderboard.c.milliseconds, faster.c.id < leaderboard.c.id)
+            )
+        )))
+        removed = result.rowcount
+        db.session.execute(text('CREATE UNIQUE INDEX uq_leaderboard_user_difficulty ON leaderboard (user_id, difficulty)'))
+    if 'ix_leaderboard_difficulty_milliseconds' not in indexes:
+        db.session.execute(text('CREATE INDEX ix_leaderboard_difficulty_milliseconds ON leaderboard (difficulty, milliseconds)'))
+    db.session.commit()
+    click.echo(f'Removed {removed} duplicate leaderboard rows, indexes are in place')
+
+
+def _read_prices(path):
+    # CSV с колонками id,price или JSON-объект {"<id>": <price>}
+    with open(path, newline='', encoding='utf-8') as f:
+        if path.endswith('.json'):
+            items = json.load(f).items()
+        else:
+            items = ((row['id'], row['price']) for row in csv.DictReader(f))
+        try:
+            prices = {int(background_id): int(price) for background_id, price in items}
+        except (KeyError, TypeError, ValueError):
+            raise click.BadParameter('expected id,price rows or a {"id": price} object', param_hint='prices')
+    if any(price < 0 for price in prices.values()):
+        raise click.BadParameter('prices must not be negative', param_hint='prices')
+    return prices
+
+
+def _seed_backgrounds(prices):
+    if not prices:
+        return 0
+    stmt = dialect_insert(Background.__table__).values([{'id': i, 'price': price} for i, price in prices.items()])
+    stmt = stmt.on_conflict_do_update(index_elements=['id'], set_={'price': stmt.excluded.price})
+    db.session.execute(stmt)
+    return len(prices)
+
+
+@click.command('seed-backgrounds')
+@click.argument('path', type=click.Path(exists=True, dir_okay=False))
+@with_appcontext
+def seed_backgrounds(path):
+    """Create or update the background catalog from a price list."""
+    seeded = _seed_backgrounds(_read_prices(path))
+    db.session.commit()
+    click.echo(f'Seeded {seeded} backgrounds')
+
+
+@click.command('migrate-backgrounds')
+@click.option('--batch-size', default=5000, show_default=True)
+@click.option('--prices', type=click.Path(exists=True, dir_okay=False),
+              help='Background price list (id,price CSV or JSON object) to seed the catalog with.')
+@with_appcontext
+def migrate_backgrounds(batch_size, prices):
+    """Move user.available_bg strings into the user_background table and seed the catalog."""
+    # раньше цену присылал клиент; без каталога /get_backgrounds пуст, а /add_bg отвечает 404
+    catalog = _read_prices(prices) if prices else {}
+    if not catalog and db.session.query(Background.id).first() is None:
+        raise click.UsageError('The background catalog is empty: pass --prices with the current price list')
+
+    columns = [c['name'] for c in inspect(db.engine).get_columns('user')]
+    if 'available_bg' not in columns:
+        seeded = _seed_backgrounds(catalog)
+        db.session.commit()
+        click.echo(f'user.available_bg is already migrated, seeded {seeded} backgrounds')
+        return
+
+    legacy_user = table('user', column('id'), column('available_bg'))
+    rows = db.session.execute(
+        select(legacy_user.c.id, legacy_user.c.available_bg).where(legacy_user.c.available_bg != ''),
+        execution_options={'yield_per': batch_size}
+    )
+
+    batch = []
+    migrated = 0
+    for user_id, available_bg in rows:
+        owned = {int(part) for part in available_bg.split(',') if part.strip().isdigit()}
+        batch.extend({'user_id': user_id, 'background_id': background_id} for background_id in owned)
+        if len(batch) >= batch_size:
+            db.session.execute(insert(UserBackground), batch)
+            migrated += len(batch)
+            batch = []
+    if batch:
+        db.session.execute(insert(UserBackground), batch)
+        migrated += len(batch)
+
+    seeded = _seed_backgrounds(catalog)
+    db.session.execute(text('ALTER TABLE "user" DROP COLUMN available_bg'))
+    db.session.commit()
+    click.echo(f'Migrated {migrated} backgrounds, seeded {seeded} backgrounds into the catalog')
+
+
+def _read_users(path, fmt):
+    with open(path, newline='', encoding='utf-8') as f:
+        if fmt == 'csv':
+            yield from csv.DictReader(f)
+        else:
+            for line in f:
+                if line.strip():
+                    yield json.loads(line)
+
+
+# в файл отказов пароли не попадают ни в каком виде
+SECRET_FIELDS = ('password', 'password_hash')
+
+
+def _validate(row):
+    username = (row.get('username') or '').strip()
+    email = (row.get('email') or '').strip()
+    if not username or not email:
+        return 'username and email are required'
+    if len(username) > 50 or len(email) > 120:
+        return 'username or email is too long'
+    if '@' not in email or '.' not in email:
+        return 'invalid email format'
+    password_hash = row.get('password_hash') or ''
+    if not row.get('password') and not password_hash.startswith('$2'):
+        return 'password or bcrypt password_hash is required'
+    if password_hash.startswith('$2') and len(password_hash) > User.password.type.length:
+        return 'password_hash is too long for a bcrypt hash'
+    try:
+        int(row.get('coins') or 10)
+    except (TypeError, ValueError):
+        return 'coins must be an integer'
+    return None
+
+
+def _existing(column_, values):
+    # одна выборка на пачку вместо двух SELECT на пользователя
+    return set(db.session.execute(select(column_).where(column_.in_(values))).scalars())
+
+
+@click.command('import-users')
+@click.argument('path', type=click.Path(exists=True, dir_okay=False))
+@click.option('--format', 'fmt', type=click.Choice(['csv', 'jsonl']), help='By default taken from the file extension.')
+@click.option('--batch-size', default=2000, show_default=True)
+@click.option('--workers', default=os.cpu_count(), show_default=True, help='Processes hashing passwords.')
+@click.option('--rounds', type=int, help='bcrypt rounds, BCRYPT_LOG_ROUNDS by default.')
+@click.option('--verification', type=click.Choice(['trusted', 'email']), default='trusted', show_default=True,
+              help='trusted: import as verified; email: send verification codes.')
+@click.option('--rejects', type=click.Path(dir_okay=False), help='Write rejected rows here as JSONL.')
+@with_appcontext
+def import_users(path, fmt, batch_size, workers, rounds, verification, rejects):
+    """Import users from a CSV or JSONL file (username, email, password or password_hash, coins)."""
+    fmt = fmt or ('jsonl' if path.endswith(('.jsonl', '.ndjson')) else 'csv')
+    rounds = rounds or current_app.config['BCRYPT_LOG_ROUNDS']
+    rejects_file = open(rejects, 'w', encoding='utf-8') if rejects else None
+    seen_usernames, seen_emails = set(), set()
+    imported = rejected = 0
+    started = time.perf_counter()
+
+    def reject(row, reason):
+        nonlocal rejected
+        rejected += 1
+        if rejects_file:
+            row = {key: value for key, value in row.items() if key not in SECRET_FIELDS}
+            rejects_file.write(json.dumps({'row': row, 'reason': reason}, ensure_ascii=False) + '\n')
+
+    rows = _read_users(path, fmt)
+    try:
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            while batch := list(islice(rows, batch_size)):
+                candidates = []
+                for row in batch:
+                    reason = _validate(row)
+                    if reason is None:
+                        row = {**row, 'username': row['username'].strip(), 'email': row['email'].strip()}
+                        if row['username'] in seen_usernames or row['email'] in seen_emails:
+                            reason = 'duplicate in file'
+                    if reason:
+                        reject(row, reason)
+                        continue
+                    seen_usernames.add(row['username'])
+                    seen_emails.add(row['email'])
+                    candidates.append(row)
+
+                taken_usernames = _existing(User.username, [row['username'] for row in candidates])
+                taken_emails = _existing(User.email, [row['email'] for row in candidates])
+                fresh = []
+                for row in candidates:
+                    if row['username'] in taken_usernames or row['email'] in taken_emails:
+                        reject(row, 'username or email already exists')
+                    else:
+                        fresh.append(row)
+
+                # готовые bcrypt-хэши переносим как есть, login сам перехэширует при другом числе раундов
+                plain = [row for row in fresh if not (row.get('password_hash') or '').startswith('$2')]
+                hashes = dict(zip(map(id, plain), pool.map(hash_password, [row['password'] for row in plain], [rounds] * len(plain), chunksize=max(1, len(plain) // (workers * 4)))))
+
+                users = [{
+                    'username': row['username'],
+                    'email': row['email'],
+                    'password': hashes.get(id(row)) or row['password_hash'],
+                    'role': 'player',
+                    'coins': int(row.get('coins') or 10),
+                    'is_verified': verification == 'trusted',
+                    'verification_code': generate_verification_code() if verification == 'email' else None,
+                    'enabled_2fa': False,
+                    'attempts': 0
+                } for row in fresh]
+                if not users:
+                    continue
+                try:
+                    db.session.execute(insert(User), users)
+                    db.session.commit()
+                except (IntegrityError, DataError):
+                    # кто-то зарегистрировался параллельно или строка не влезла в колонку — пишем по одному
+                    db.session.rollback()
+                    inserted = []
+                    for user in users:
+                        try:
+                            db.session.execute(insert(User), [user])
+                            db.session.commit()
+                            inserted.append(user)
+                        except IntegrityError:
+                            db.session.rollback()
+                            reject({'username': user['username'], 'email': user['email']}, 'username or email already exists')
+                        except DataError as e:
+                            db.session.rollback()
+                            reject({'username': user['username'], 'email': user['email']}, f'rejected by the database: {e.orig}')
+                    users = inserted
+
+                imported += len(users)
+                if verification == 'email':
+                    for user in users:
+                        send_verification(user['email'], user['verification_code'], block=True)
+                elapsed = time.perf_counter() - started
+                click.echo(f'{imported} imported, {rejected} rejected, {imported / elapsed:.0f} users/s')
+    finally:
+        if rejects_file:
+            rejects_file.close()
+
+    if verification == 'email':
+        mailer.join()
+    elapsed = time.perf_counter() - started
+    click.echo(f'Imported {imported} users, rejected {rejected} in {elapsed:.1f}s ({imported / elapsed:.0f} users/s)')
+
+
+@click.command('prune-boards')
+@click.option('--keep-days', default=90, show_default=True)
+@with_appcontext
+def prune_boards(keep_days):
+    """Delete daily period boards older than --keep-days; weekly and seasonal boards are kept."""
+    # закрытые доски — это уже готовые топ-N, архивировать их не нужно; дневных просто много
+    cutoff = datetime.date.today() - datetime.timedelta(days=keep_days)
+    result = db.session.execute(delete(PeriodBoard).where(
+        PeriodBoard.period.startswith('day:'),
+        PeriodBoard.period < f'day:{cutoff.isoformat()}'
+    ))
+    db.session.commit()
+    click.echo(f'Deleted {result.rowcount} rows of daily boards before {cutoff.isoformat()}')
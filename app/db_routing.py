@@ -0,0 +1,92 @@
+import random
+import threading
+import time
+from functools import wraps
+import sqlalchemy as sa
+from sqlalchemy import event
+from flask import g, has_request_context, request
+from flask_sqlalchemy.session import Session
+
+
+REPLICA_PREFIX = 'replica_'
+STICKY_COOKIE = 'db_sticky_until'
+STICKY_HEADER = 'X-DB-Sticky-Until'
+
+
+class StickyWriters:
+    def __init__(self, seconds=5, maxsize=100000):
+        self.seconds = seconds
+        self.maxsize = maxsize
+        self._deadlines = {}  # user_id -> monotonic deadline
+        self._lock = threading.Lock()
+
+    def init_app(self, app):
+        self.seconds = app.config.get('DB_STICKY_SECONDS', self.seconds)
+        app.after_request(self._set_deadline)
+
+    def mark(self, user_id):
+        now = time.monotonic()
+        with self._lock:
+            if len(self._deadlines) >= self.maxsize:
+                self._deadlines = {k: v for k, v in self._deadlines.items() if v > now}
+            self._deadlines[user_id] = now + self.seconds
+        # словарь живёт в одном процессе, поэтому дедлайн отдаётся ещё и клиенту:
+        # следующий запрос может попасть в другой воркер
+        g.db_sticky_until = time.time() + self.seconds
+
+    def is_sticky(self, user_id):
+        deadline = self._deadlines.get(user_id)
+        if deadline is not None and deadline > time.monotonic():
+            return True
+        return self._client_deadline()
+
+    def _client_deadline(self):
+        value = request.headers.get(STICKY_HEADER) or request.cookies.get(STICKY_COOKIE)
+        if not value:
+            return False
+        try:
+            deadline = float(value)
+        except ValueError:
+            return False
+        now = time.time()
+        return now < deadline <= now + self.seconds
+
+    def _set_deadline(self, response):
+        deadline = g.get('db_sticky_until')
+        if deadline is not None:
+            response.headers[STICKY_HEADER] = f'{deadline:.3f}'
+            response.set_cookie(STICKY_COOKIE, f'{deadline:.3f}', max_age=int(self.seconds) + 1, httponly=True, samesite='Lax')
+        return response
+
+
+sticky_writers = StickyWriters()
+
+
+class RoutingSession(Session):
+    def get_bind(self, mapper=None, clause=None, bind=None, **kwargs):
+        if bind is None and has_request_context():
+            if self._flushing or isinstance(clause, sa.UpdateBase):
+                g.db_wrote = True
+            elif g.get('db_read_only') and not g.get('db_wrote') and not sticky_writers.is_sticky(g.get('user_id')):
+                replicas = [key for key in self._db.engines if key and key.startswith(REPLICA_PREFIX)]
+                if replicas:
+                    if 'db_replica' not in g:
+                        g.db_replica = random.choice(replicas)
+                    return self._db.engines[g.db_replica]
+        return super().get_bind(mapper=mapper, clause=clause, bind=bind, **kwargs)
+
+
+@event.listens_for(RoutingSession, 'after_commit')
+def _after_commit(session):
+    # read-your-writes: после записи пользователь какое-то время читает с primary
+    if has_request_context() and g.get('db_wrote') and g.get('user_id') is not None:
+        sticky_writers.mark(g.user_id)
+
+
+def read_only(f):
+    @wraps(f)
+    def decorated(*args, **kwargs):
+        g.db_read_only = True
+        return f(*args, **kwargs)
+
+    return decorated
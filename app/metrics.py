@@ -0,0 +1,168 @@
+import threading
+import time
+from bisect import bisect_left
+from flask import Blueprint, Response, request, g, has_request_context
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+from sqlalchemy.pool import QueuePool
+
+
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10)
+QUERY_BUCKETS = (0, 1, 2, 3, 5, 8, 13, 21, 50)
+MAX_STATEMENTS_PER_REQUEST = 50
+
+
+class Histogram:
+    __slots__ = ('buckets', 'counts', 'sum', 'count')
+
+    def __init__(self, buckets):
+        self.buckets = buckets
+        self.counts = [0] * (len(buckets) + 1)
+        self.sum = 0.0
+        self.count = 0
+
+    def observe(self, value):
+        self.counts[bisect_left(self.buckets, value)] += 1
+        self.sum += value
+        self.count += 1
+
+    def render(self, name, labels):
+        lines = []
+        cumulative = 0
+        for bound, count in zip(self.buckets, self.counts):
+            cumulative += count
+            lines.append(f'{name}_bucket{{{labels}le="{bound}"}} {cumulative}')
+        lines.append(f'{name}_bucket{{{labels}le="+Inf"}} {self.count}')
+        lines.append(f'{name}_sum{{{labels.rstrip(",")}}} {self.sum}')
+        lines.append(f'{name}_count{{{labels.rstrip(",")}}} {self.count}')
+        return lines
+
+
+class Metrics:
+    def __init__(self):
+        self.slow_request_seconds = 0.5
+        self.token = None
+        self.commits = 0
+        self.rollbacks = 0
+        self.pool_wait = Histogram(LATENCY_BUCKETS)
+        self._routes = {}  # (method, rule, status) -> [latency, queries, sql_time]
+        self._lock = threading.Lock()
+
+    def init_app(self, app):
+        self.slow_request_seconds = app.config.get('SLOW_REQUEST_MS', 500) / 1000
+        self.token = app.config.get('METRICS_TOKEN')
+        app.before_request(self._before_request)
+        app.after_request(self._after_request)
+        app.register_blueprint(metrics_bp)
+
+    def _before_request(self):
+        g.metrics_started = time.perf_counter()
+        g.sql_count = 0
+        g.sql_time = 0.0
+        g.sql_statements = []
+
+    def _after_request(self, response):
+        started = g.pop('metrics_started', None)
+        if started is None:
+            return response
+        elapsed = time.perf_counter() - started
+        rule = request.url_rule.rule if request.url_rule else 'unmatched'
+        key = (request.method, rule, response.status_code)
+
+        with self._lock:
+            series = self._routes.get(key)
+            if series is None:
+                series = self._routes[key] = [Histogram(LATENCY_BUCKETS), Histogram(QUERY_BUCKETS), Histogram(LATENCY_BUCKETS)]
+            series[0].observe(elapsed)
+            series[1].observe(g.sql_count)
+            series[2].observe(g.sql_time)
+
+        if elapsed >= self.slow_request_seconds:
+            statements = '\n'.join(f'  {duration * 1000:.1f} ms: {statement}' for statement, duration in g.sql_statements)
+            print(f"Slow request {request.method} {request.path}: {elapsed * 1000:.1f} ms, {g.sql_count} queries\n{statements}")
+        return response
+
+    def record_query(self, statement, duration):
+        if has_request_context() and 'sql_count' in g:
+            g.sql_count += 1
+            g.sql_time += duration
+            if len(g.sql_statements) < MAX_STATEMENTS_PER_REQUEST:
+                g.sql_statements.append((statement, duration))
+
+    def render(self):
+        from app.utils.broadcaster import leaderboard_broadcaster
+        from app.utils.period_boards import period_board_cache
+        from app.utils.records_cache import records_cache
+        from app.utils.user_cache import user_cache
+
+        lines = []
+        with self._lock:
+            routes = sorted(self._routes.items())
+            # формат Prometheus требует, чтобы все серии одного семейства шли подряд после его TYPE
+            for position, name in enumerate(('saper_request_duration_seconds', 'saper_request_queries', 'saper_request_sql_seconds')):
+                lines.append(f'# TYPE {name} histogram')
+                for (method, rule, status), series in routes:
+                    lines += series[position].render(name, f'method="{method}",route="{rule}",status="{status}",')
+            lines += ['# TYPE saper_db_pool_wait_seconds histogram'] + self.pool_wait.render('saper_db_pool_wait_seconds', '')
+
+        user_stats = user_cache.stats()
+        lines += [
+            '# TYPE saper_db_commits_total counter',
+            f'saper_db_commits_total {self.commits}',
+            '# TYPE saper_db_rollbacks_total counter',
+            f'saper_db_rollbacks_total {self.rollbacks}',
+            '# TYPE saper_cache_hits_total counter',
+            f'saper_cache_hits_total{{cache="user"}} {user_stats["hits"]}',
+            f'saper_cache_hits_total{{cache="records"}} {records_cache.hits}',
+            f'saper_cache_hits_total{{cache="period_boards"}} {period_board_cache.hits}',
+            '# TYPE saper_cache_misses_total counter',
+            f'saper_cache_misses_total{{cache="user"}} {user_stats["misses"]}',
+            f'saper_cache_misses_total{{cache="records"}} {records_cache.misses}',
+            f'saper_cache_misses_total{{cache="period_boards"}} {period_board_cache.misses}',
+            '# TYPE saper_sse_subscribers gauge',
+            f'saper_sse_subscribers {leaderboard_broadcaster.stats()["subscribers"]}'
+        ]
+        return '\n'.join(lines) + '\n'
+
+
+metrics = Metrics()
+
+
+class TimedQueuePool(QueuePool):
+    def _do_get(self):
+        started = time.perf_counter()
+        try:
+            return super()._do_get()
+        finally:
+            metrics.pool_wait.observe(time.perf_counter() - started)
+
+
+@event.listens_for(Engine, 'before_cursor_execute')
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    conn.info.setdefault('query_started', []).append(time.perf_counter())
+
+
+@event.listens_for(Engine, 'after_cursor_execute')
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    started = conn.info['query_started'].pop()
+    metrics.record_query(statement, time.perf_counter() - started)
+
+
+@event.listens_for(Engine, 'commit')
+def _commit(conn):
+    metrics.commits += 1
+
+
+@event.listens_for(Engine, 'rollback')
+def _rollback(conn):
+    metrics.rollbacks += 1
+
+
+metrics_bp = Blueprint('metrics', __name__)
+
+
+@metrics_bp.route('/metrics', methods=['GET'])
+def prometheus_metrics():
+    if metrics.token and request.headers.get('Authorization') != f'Bearer {metrics.token}':
+        return Response('Forbidden\n', status=403, mimetype='text/plain')
+    return Response(metrics.render(), mimetype='text/plain; version=0.0.4')
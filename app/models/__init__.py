@@ -1,2 +1,9 @@
 from app.models.user import User
-from app.models.leaderboard import Leaderboard, Difficulty 
\ No newline at end of file
+from app.models.leaderboard import Leaderboard, Difficulty
+from app.models.coin_ledger import CoinLedger
+from app.models.background import Background, UserBackground
+from app.models.revoked_token import RevokedToken
+from app.models.run import Run, RunDailyStats
+from app.models.run_sketch import RunSketch
+from app.models.period_board import PeriodBoard
+from app.models.idempotency_record import IdempotencyRecord
\ No newline at end of file
@@ -0,0 +1,22 @@
+from app import db
+
+class Background(db.Model):
+    id = db.Column(db.Integer, primary_key=True, autoincrement=False)
+    price = db.Column(db.Integer, nullable=False)
+
+    def __repr__(self):
+        return f"Background(id={self.id}, price={self.price})"
+
+    def to_dict(self):
+        return {
+            'id': self.id,
+            'price': self.price
+        }
+
+
+class UserBackground(db.Model):
+    user_id = db.Column(db.Integer, db.ForeignKey('user.id'), primary_key=True)
+    background_id = db.Column(db.Integer, primary_key=True)
+
+    def __repr__(self):
+        return f"UserBackground(user_id={self.user_id}, background_id={self.background_id})"
@@ -0,0 +1,12 @@
+from app import db
+
+class CoinLedger(db.Model):
+    id = db.Column(db.Integer, primary_key=True)
+    user_id = db.Column(db.Integer, db.ForeignKey('user.id'), nullable=False, index=True)
+    delta = db.Column(db.Integer, nullable=False)
+    balance = db.Column(db.Integer, nullable=False)
+    reason = db.Column(db.String(20), nullable=False)
+    created_at = db.Column(db.DateTime, nullable=False)
+
+    def __repr__(self):
+        return f"CoinLedger(user_id={self.user_id}, delta={self.delta}, reason={self.reason})"
@@ -0,0 +1,13 @@
+from app import db
+
+class IdempotencyRecord(db.Model):
+    # status = NULL — запрос с этим ключом ещё выполняется в каком-то воркере
+    key = db.Column(db.String(200), primary_key=True)
+    fingerprint = db.Column(db.String(40), nullable=False)
+    status = db.Column(db.Integer, nullable=True)
+    mimetype = db.Column(db.String(100), nullable=True)
+    body = db.Column(db.LargeBinary, nullable=True)
+    expires_at = db.Column(db.DateTime(timezone=True), nullable=False, index=True)
+
+    def __repr__(self):
+        return f"IdempotencyRecord(key={self.key}, status={self.status})"
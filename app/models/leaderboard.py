@@ -7,8 +7,13 @@ class Difficulty(enum.Enum):
     hard = 'hard'
 
 class Leaderboard(db.Model):
+    __table_args__ = (
+        db.UniqueConstraint('user_id', 'difficulty', name='uq_leaderboard_user_difficulty'),
+        db.Index('ix_leaderboard_difficulty_milliseconds', 'difficulty', 'milliseconds'),
+    )
+
     id = db.Column(db.Integer, primary_key=True)
-    created_at = db.Column(db.DateTime)
+    created_at = db.Column(db.DateTime, index=True)
     milliseconds = db.Column(db.Integer, nullable=False)
     username = db.Column(db.String(50), nullable=False)
     user_id = db.Column(db.Integer, db.ForeignKey('user.id'), nullable=False)
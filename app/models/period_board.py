@@ -0,0 +1,18 @@
+from app import db
+from app.models.leaderboard import Difficulty
+
+class PeriodBoard(db.Model):
+    # топ-N за день/неделю/сезон; period — ключ вида "day:2026-10-18", "week:2026-W42", "season:2026-Q4"
+    __table_args__ = (
+        db.Index('ix_period_board_period_difficulty_milliseconds', 'period', 'difficulty', 'milliseconds'),
+    )
+
+    period = db.Column(db.String(20), primary_key=True)
+    difficulty = db.Column(db.Enum(Difficulty), primary_key=True)
+    user_id = db.Column(db.Integer, db.ForeignKey('user.id'), primary_key=True)
+    username = db.Column(db.String(50), nullable=False)
+    milliseconds = db.Column(db.Integer, nullable=False)
+    created_at = db.Column(db.DateTime, nullable=False)
+
+    def __repr__(self):
+        return f"PeriodBoard(period={self.period}, user_id={self.user_id}, milliseconds={self.milliseconds})"
@@ -0,0 +1,10 @@
+from app import db
+
+class RevokedToken(db.Model):
+    # key: jti отдельного токена или "user:<id>" для отзыва всех токенов пользователя
+    key = db.Column(db.String(64), primary_key=True)
+    revoked_at = db.Column(db.DateTime(timezone=True), nullable=False)
+    expires_at = db.Column(db.DateTime(timezone=True), nullable=False, index=True)
+
+    def __repr__(self):
+        return f"RevokedToken(key={self.key}, expires_at={self.expires_at})"
@@ -0,0 +1,43 @@
+from sqlalchemy import DDL, event
+from app import db
+from app.models.leaderboard import Difficulty
+
+class Run(db.Model):
+    # журнал забегов: только INSERT, лучший результат по-прежнему лежит в Leaderboard
+    id = db.Column(db.BigInteger().with_variant(db.Integer, 'sqlite'), primary_key=True)
+    user_id = db.Column(db.Integer, db.ForeignKey('user.id'), nullable=False, index=True)
+    difficulty = db.Column(db.Enum(Difficulty), nullable=False)
+    milliseconds = db.Column(db.Integer, nullable=False)
+    played_at = db.Column(db.DateTime, nullable=False)
+
+    def __repr__(self):
+        return f"Run(user_id={self.user_id}, milliseconds={self.milliseconds}, difficulty={self.difficulty})"
+
+
+# BRIN через DDL, а не postgresql_using: иначе диалект PostgreSQL грузится при импорте моделей и на SQLite
+event.listen(Run.__table__, 'after_create', DDL(
+    'CREATE INDEX ix_run_played_at ON run USING brin (played_at)'
+).execute_if(dialect='postgresql'))
+event.listen(Run.__table__, 'after_create', DDL(
+    'CREATE INDEX ix_run_played_at ON run (played_at)'
+).execute_if(callable_=lambda ddl, target, bind, **kw: bind.dialect.name != 'postgresql'))
+
+
+class RunDailyStats(db.Model):
+    day = db.Column(db.Date, primary_key=True)
+    difficulty = db.Column(db.Enum(Difficulty), primary_key=True)
+    runs = db.Column(db.Integer, nullable=False)
+    best_milliseconds = db.Column(db.Integer, nullable=False)
+    total_milliseconds = db.Column(db.BigInteger, nullable=False)
+
+    def __repr__(self):
+        return f"RunDailyStats(day={self.day}, difficulty={self.difficulty}, runs={self.runs})"
+
+    def to_dict(self):
+        return {
+            'day': self.day.isoformat(),
+            'difficulty': self.difficulty.value,
+            'runs': self.runs,
+            'best': self.best_milliseconds,
+            'mean': round(self.total_milliseconds / self.runs, 1)
+        }
@@ -0,0 +1,11 @@
+from app import db
+from app.models.leaderboard import Difficulty
+
+class RunSketch(db.Model):
+    # сериализованный KLL-скетч всех забегов сложности, см. app/utils/quantiles.py
+    difficulty = db.Column(db.Enum(Difficulty), primary_key=True)
+    data = db.Column(db.JSON, nullable=False)
+    updated_at = db.Column(db.DateTime(timezone=True), nullable=False)
+
+    def __repr__(self):
+        return f"RunSketch(difficulty={self.difficulty}, updated_at={self.updated_at})"
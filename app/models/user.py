@@ -11,13 +11,19 @@ class User(db.Model):
     is_verified = db.Column(db.Boolean, default=False)
     secret_2fa = db.Column(db.String(16), nullable=True)
     enabled_2fa = db.Column(db.Boolean, default=False)
-    available_bg = db.Column(db.String(800), nullable=False)
     attempts = db.Column(db.Integer, nullable=False)
     ban_until = db.Column(db.DateTime(timezone=True))
 
+    backgrounds = db.relationship('UserBackground', lazy=True, order_by='UserBackground.background_id')
+
     def __repr__(self):
         return f"User('{self.username}', '{self.role}')"
 
+    @property
+    def available_bg(self):
+        # прежний формат "1,2,3," сохраняем для клиента
+        return ''.join(f'{bg.background_id},' for bg in self.backgrounds)
+
     def to_dict(self):
         return {
             'id': self.id,
@@ -25,9 +31,7 @@ class User(db.Model):
             'role': self.role,
             'coins': self.coins,
             'email': self.email,
-            'verification_code': self.verification_code,
             'is_verified': self.is_verified,
-            'secret_2fa': self.secret_2fa,
             'enabled_2fa': self.enabled_2fa,
             'available_bg': self.available_bg,
             'attempts': self.attempts,
@@ -1,10 +1,19 @@
-from flask import Blueprint, jsonify
-from app.models import User
+from flask import Blueprint, Response, request, jsonify, stream_with_context
+from datetime import datetime, timezone
+from sqlalchemy import or_
+from app import db
+from app.models import User, Background
+from app.db_routing import read_only
 from app.utils.auth import admin_required
+from app.utils.idempotency import idempotency_store
+from app.utils.serializers import user_schema, dumps, json_response
+from app.utils.user_cache import user_cache
 
 
 admin_bp = Blueprint('admin', __name__)
 
+STREAM_CHUNK_SIZE = 1000
+
 
 @admin_bp.route('/admin', methods=['GET'])
 @admin_required
@@ -12,9 +21,81 @@ def admin(current_user):
     return jsonify({'message': f'Hello, {current_user.username}! You have access to the admin panel.'}), 200
 
 
+def _bool_arg(name):
+    value = request.args.get(name)
+    if value is None:
+        return None
+    return value.lower() in ('1', 'true', 'yes')
+
+
+def _users_query():
+    query = user_schema.select('admin').order_by(User.id)
+
+    role = request.args.get('role')
+    if role:
+        query = query.where(User.role == role)
+
+    verified = _bool_arg('verified')
+    if verified is not None:
+        query = query.where(User.is_verified == verified)
+
+    banned = _bool_arg('banned')
+    if banned is not None:
+        now = datetime.now(timezone.utc)
+        if banned:
+            query = query.where(User.ban_until > now)
+        else:
+            query = query.where(or_(User.ban_until.is_(None), User.ban_until <= now))
+
+    return query
+
+
 @admin_bp.route('/users', methods=['GET'])
+@read_only
 @admin_required
 def get_all_users(current_user):
-    users = User.query.all()
-    user_list = [user.to_dict() for user in users]
-    return jsonify({'users': user_list}), 200 
\ No newline at end of file
+    query = _users_query()
+
+    if request.args.get('format') == 'ndjson':
+        def generate():
+            rows = db.session.execute(query.execution_options(stream_results=True, yield_per=STREAM_CHUNK_SIZE))
+            for chunk in rows.partitions():
+                yield b''.join(dumps(user) + b'\n' for user in user_schema.rows(chunk, 'admin'))
+
+        return Response(stream_with_context(generate()), mimetype='application/x-ndjson')
+
+    after_id = request.args.get('after_id', 0, type=int)
+    limit = max(1, min(request.args.get('limit', 100, type=int), 1000))
+    users = user_schema.rows(db.session.execute(query.where(User.id > after_id).limit(limit)), 'admin')
+
+    next_after_id = users[-1]['id'] if len(users) == limit else None
+    return json_response({'users': users, 'next_after_id': next_after_id})
+
+
+@admin_bp.route('/cache_stats', methods=['GET'])
+@admin_required
+def cache_stats(current_user):
+    return jsonify({'user_cache': user_cache.stats(), 'idempotency': idempotency_store.stats()}), 200
+
+
+@admin_bp.route('/set_bg_price', methods=['POST'])
+@admin_required
+def set_bg_price(current_user):
+    data = request.get_json()
+    try:
+        background_id = int(data.get('id'))
+        price = int(data.get('price'))
+    except (TypeError, ValueError):
+        return jsonify({'message': 'Invalid data. Requires: id (integer), price (integer)'}), 400
+
+    if price < 0:
+        return jsonify({'message': 'Invalid price'}), 400
+
+    background = db.session.get(Background, background_id)
+    if background:
+        background.price = price
+    else:
+        db.session.add(Background(id=background_id, price=price))
+    db.session.commit()
+
+    return jsonify({'message': 'ok'}), 200
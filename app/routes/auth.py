@@ -1,18 +1,55 @@
-from flask import Blueprint, request, jsonify, send_file
-from app import db, bcrypt
+from flask import Blueprint, request, jsonify, current_app
+from app import db
 from app.models import User
-import pyqrcode
-import onetimepass
-from io import BytesIO
-from app.utils.auth import token_required, generate_secret
+from app.utils.auth import token_required, cached_user_required, claims_required, generate_secret
 from app.utils.email import generate_verification_code, send_verification
-from app.utils.token import generate_token
+from app.utils.passwords import password_hasher, HasherBusy
+from app.utils.qr import QR_FORMATS, qr_cache, render_qr
+from app.utils.throttle import login_throttle
+from app.utils.token import generate_token, generate_refresh_token, verify_token, revoke_user_tokens
+from app.utils.revocation import revocation_list
+from app.utils.user_cache import user_cache
+from app.utils.lazy_import import lazy_import
 from datetime import datetime, timezone, timedelta
 
+# нужен только маршрутам 2FA
+onetimepass = lazy_import('onetimepass')
+
 
 auth_bp = Blueprint('auth', __name__)
 
 
+@auth_bp.errorhandler(HasherBusy)
+def hasher_busy(err):
+    return jsonify({'message': 'Server is busy, please try again later'}), 503
+
+
+def _throttled(username):
+    retry_after = login_throttle.retry_after(request.remote_addr, username)
+    if retry_after:
+        return jsonify({'message': 'Too many login attempts, try again later'}), 429, {'Retry-After': str(retry_after)}
+    return None
+
+
+def _login_failed(user, username):
+    if login_throttle.fail(request.remote_addr, username) and user:
+        user.attempts = login_throttle.by_username.limit
+        user.ban_until = datetime.now(timezone.utc) + timedelta(minutes=5)
+        revoke_user_tokens(user.id)
+        db.session.commit()
+        user_cache.invalidate_user(user)
+
+
+def _login_succeeded(user, username, password):
+    login_throttle.succeed(username)
+    if user.attempts or user.ban_until:
+        user.attempts = 0  # Сбрасываем счетчик попыток при успешном входе
+        user.ban_until = None
+    if password_hasher.needs_rehash(user.password):
+        user.password = password_hasher.hash(password)
+    db.session.commit()
+
+
 # BASE AUTH ROUTES
 @auth_bp.route('/login', methods=['POST'])
 def login():
@@ -24,19 +61,21 @@ def login():
     if not username or not password:
         return jsonify({'message': 'Username and password are required'}), 400
 
+    throttled = _throttled(username)
+    if throttled:
+        return throttled
+
     user = User.query.filter_by(username=username).first()
 
     if not user:
+        _login_failed(None, username)
         return jsonify({'message': 'Invalid username or password'}), 401
 
     if user.ban_until and user.ban_until > datetime.now(timezone.utc):
         return jsonify({'message': 'Your account is banned until ' + str(user.ban_until)}), 403
 
-    if not bcrypt.check_password_hash(user.password, password):
-        user.attempts += 1
-        if user.attempts >= 5:
-            user.ban_until = datetime.now(timezone.utc) + timedelta(minutes=5)
-        db.session.commit()
+    if not password_hasher.check(user.password, password):
+        _login_failed(user, username)
         return jsonify({'message': 'Invalid username or password'}), 401
 
     if not user.is_verified:
@@ -45,11 +84,8 @@ def login():
     if user.enabled_2fa:
         return jsonify({'requires_2fa': True}), 200
 
-    user.attempts = 0  # Сбрасываем счетчик попыток при успешном входе
-    user.ban_until = None
-    db.session.commit()
-    token = generate_token(user)
-    return jsonify({'access_token': token}), 200
+    _login_succeeded(user, username, password)
+    return jsonify({'access_token': generate_token(user), 'refresh_token': generate_refresh_token(user)}), 200
 
 
 @auth_bp.route('/verify_2fa_login', methods=['POST'])
@@ -62,19 +98,21 @@ def verify_2fa_login():
     if not username or not password or not otp:
         return jsonify({'message': 'Username, password and OTP are required'}), 400
 
+    throttled = _throttled(username)
+    if throttled:
+        return throttled
+
     user = User.query.filter_by(username=username).first()
 
     if not user:
+        _login_failed(None, username)
         return jsonify({'message': 'Invalid username or password'}), 401
 
     if user.ban_until and user.ban_until > datetime.now(timezone.utc):
         return jsonify({'message': 'Your account is banned until ' + str(user.ban_until)}), 403
 
-    if not bcrypt.check_password_hash(user.password, password):
-        user.attempts += 1
-        if user.attempts >= 5:
-            user.ban_until = datetime.now(timezone.utc) + timedelta(minutes=5)
-        db.session.commit()
+    if not password_hasher.check(user.password, password):
+        _login_failed(user, username)
         return jsonify({'message': 'Invalid username or password'}), 401
 
     if not user.is_verified:
@@ -84,17 +122,50 @@ def verify_2fa_login():
         return jsonify({'message': '2FA is not enabled for this user'}), 400
 
     if not onetimepass.valid_totp(otp, user.secret_2fa):
-        user.attempts += 1
-        if user.attempts >= 5:
-            user.ban_until = datetime.now(timezone.utc) + timedelta(minutes=5)
-        db.session.commit()
+        _login_failed(user, username)
         return jsonify({'message': 'Invalid 2FA code'}), 401
 
-    user.attempts = 0  # Сбрасываем счетчик попыток при успешном входе
-    user.ban_until = None
+    _login_succeeded(user, username, password)
+    return jsonify({'access_token': generate_token(user), 'refresh_token': generate_refresh_token(user)}), 200
+
+
+@auth_bp.route('/refresh', methods=['POST'])
+def refresh():
+    data = request.get_json(silent=True) or {}
+    token = data.get('refresh_token')
+
+    if not token:
+        return jsonify({'message': 'Refresh token is required'}), 400
+
+    claims = verify_token(token, 'refresh')
+    if isinstance(claims, str):
+        return jsonify({'message': claims}), 401
+
+    user = db.session.get(User, claims['id'])
+    if not user or (user.ban_until and user.ban_until > datetime.now(timezone.utc)):
+        return jsonify({'message': 'Invalid token'}), 401
+
+    # refresh-токен одноразовый: из двух одновременных запросов с одним токеном пару получит только один
+    if not revocation_list.claim(claims):
+        db.session.rollback()
+        return jsonify({'message': 'Token has been revoked'}), 401
+    db.session.commit()
+    return jsonify({'access_token': generate_token(user), 'refresh_token': generate_refresh_token(user)}), 200
+
+
+@auth_bp.route('/logout', methods=['POST'])
+@claims_required
+def logout(claims):
+    revocation_list.revoke(claims)
+
+    data = request.get_json(silent=True) or {}
+    if data.get('refresh_token'):
+        refresh_claims = verify_token(data['refresh_token'], 'refresh')
+        if not isinstance(refresh_claims, str) and refresh_claims['id'] == claims['id']:
+            revocation_list.revoke(refresh_claims)
+
     db.session.commit()
-    token = generate_token(user)
-    return jsonify({'access_token': token}), 200
+    return jsonify({'message': 'Logged out'}), 200
 
 
 @auth_bp.route('/register', methods=['POST'])
@@ -119,8 +190,8 @@ def register():
 
     verification_code = generate_verification_code()
 
-    hashed_password = bcrypt.generate_password_hash(password).decode('utf-8')
-    new_user = User(username=username, password=hashed_password, email=email, verification_code=verification_code, is_verified=False, available_bg='', attempts=0, ban_until=None)
+    hashed_password = password_hasher.hash(password)
+    new_user = User(username=username, password=hashed_password, email=email, verification_code=verification_code, is_verified=False, attempts=0, ban_until=None)
 
     db.session.add(new_user)
     db.session.commit()
@@ -154,6 +225,7 @@ def verify_email():
         user.is_verified = True
         user.verification_code = None
         db.session.commit()
+        user_cache.invalidate_user(user)
         return jsonify({'message': 'Email verified successfully'}), 200
     else:
         return jsonify({'message': 'Invalid verification code'}), 400
@@ -201,9 +273,10 @@ def reset_password():
     if user.verification_code != code:
         return jsonify({'message': 'Invalid verification code'}), 400
 
-    hashed_password = bcrypt.generate_password_hash(new_password).decode('utf-8')
+    hashed_password = password_hasher.hash(new_password)
     user.password = hashed_password
     user.verification_code = None
+    revoke_user_tokens(user.id)
     db.session.commit()
 
     return jsonify({'message': 'Password has been reset successfully'}), 200
@@ -211,7 +284,7 @@ def reset_password():
 
 # 2FA ROUTES
 @auth_bp.route('/status_2fa', methods=['GET'])
-@token_required
+@cached_user_required
 def status_2fa(current_user):
     try:
         if current_user.enabled_2fa == True:
@@ -228,6 +301,7 @@ def enable_2fa(current_user):
     try:
         current_user.enabled_2fa = True
         db.session.commit()
+        user_cache.invalidate_user(current_user)
 
         return jsonify({ 'message': '2fa enabled' }), 200
     except Exception as err:
@@ -240,7 +314,9 @@ def disable_2fa(current_user):
     try:
         current_user.secret_2fa = None
         current_user.enabled_2fa = False
+        revoke_user_tokens(current_user.id)
         db.session.commit()
+        user_cache.invalidate_user(current_user)
 
         return jsonify({ 'message': '2fa disabled' }), 200
     except Exception as err:
@@ -250,19 +326,31 @@ def disable_2fa(current_user):
 @auth_bp.route('/generate_qr', methods=['GET'])
 @token_required
 def generate_qr(current_user):
+    fmt = request.args.get('format', 'png').lower()
+    if fmt not in QR_FORMATS:
+        return jsonify({ 'message': 'Invalid format. Supported: png, svg' }), 400
+    scale = max(1, min(request.args.get('scale', 8, type=int), 16))
+
     try:
-        secret = generate_secret()
-        current_user.secret_2fa = secret
-        otp_uri = f"otpauth://totp/Saper2fa:{current_user.email}?secret={secret}&issuer=Saper2fa"
-        qr_code = pyqrcode.create(otp_uri)
-
-        buffer = BytesIO()
-        qr_code.png(buffer, scale=8)
-        buffer.seek(0)
+        # пока идёт настройка, повторные запросы отдают тот же секрет и ту же картинку
+        secret = current_user.secret_2fa
+        if current_user.enabled_2fa or not secret or not qr_cache.has(secret):
+            secret = generate_secret()
+            current_user.secret_2fa = secret
+        email = current_user.email
         db.session.commit()
 
-        return send_file(buffer, mimetype='image/png')
+        image = qr_cache.get(secret, fmt, scale)
+        if image is None:
+            otp_uri = f"otpauth://totp/Saper2fa:{email}?secret={secret}&issuer=Saper2fa"
+            image = render_qr(otp_uri, fmt, scale)
+            qr_cache.put(secret, fmt, scale, image)
+
+        response = current_app.response_class(image, mimetype=QR_FORMATS[fmt])
+        response.headers['Cache-Control'] = 'no-store'
+        return response
     except Exception as err:
+        db.session.rollback()
         return jsonify({ 'message': f'{err}' }), 400
 
 
@@ -277,6 +365,7 @@ def verify_2fa(current_user):
             if user:
                 user.enabled_2fa = True
                 db.session.commit()
+                user_cache.invalidate_user(user)
                 return jsonify({ 'message': 'Success' }), 200
             else:
                 return jsonify({ 'message': 'User not found' }), 404
@@ -1,15 +1,35 @@
-from flask import Blueprint, request, jsonify
+from flask import Blueprint, Response, request, jsonify, current_app
 import datetime
+import queue
 from app import db
-from app.models import Leaderboard, Difficulty
-from app.utils.auth import token_required
+from app.models import Leaderboard, Difficulty, Background, UserBackground, RunDailyStats
+from app.db_routing import read_only
+from app.utils.auth import cached_user_required, claims_required
+from app.utils.broadcaster import leaderboard_broadcaster, format_event
+from app.utils.coins import debit
+from app.utils.game_session import session_store
+from app.utils.idempotency import idempotent
+from app.utils.period_boards import PERIODS, BOARD_SIZE, period_key, is_frozen, board_rows, period_board_cache
+from app.utils.quantiles import run_sketches
+from app.utils.rank_index import rank_engine, decode_cursor
+from app.utils.records import submit_record, submit_records
+from app.utils.records_cache import records_cache
+from app.utils.serializers import leaderboard_schema, dumps, json_response
+from app.utils.user_cache import user_cache
 
 
 game_bp = Blueprint('game', __name__)
 
+MAX_BATCH_RUNS = 100
+SSE_HEARTBEAT = 15
+STATS_DEFAULT_DAYS = 30
+STATS_MAX_DAYS = 366
+MAX_HISTOGRAM_BINS = 100
+
 
 @game_bp.route("/new_record", methods=['POST'])
-@token_required
+@cached_user_required
+@idempotent
 def new_record(current_user):
     data = request.get_json()
     try:
@@ -22,90 +42,347 @@ def new_record(current_user):
     if not current_user.is_verified:
         return jsonify({'message': 'User is not verified'}), 400
 
-    existing_record = Leaderboard.query.filter_by(
-        user_id=current_user.id,
-        difficulty=difficulty
-    ).first()
-
-    if existing_record:
-        if milliseconds < existing_record.milliseconds:
-            existing_record.milliseconds = milliseconds
-            existing_record.created_at = datetime.datetime.now()
-            db.session.commit()
-            current_user.coins += 15
-            db.session.commit()
-        else:
-            return jsonify({'message': 'New record submitted, but it is not in the top 10.'}), 200
-    else:
-        new_record = Leaderboard(
-            created_at=datetime.datetime.now(),
-            milliseconds=milliseconds,
-            username=current_user.username,
-            user_id=current_user.id,
-            difficulty=difficulty
-        )
-        db.session.add(new_record)
-        db.session.commit()
-        current_user.coins += 15
-        db.session.commit()
-
-    top_10 = Leaderboard.query.filter_by(difficulty=difficulty).order_by(Leaderboard.milliseconds.asc()).limit(10).all()
-
-    if len(top_10) < 10 or milliseconds < top_10[-1].milliseconds:
-        all_records = Leaderboard.query.filter_by(difficulty=difficulty).order_by(Leaderboard.milliseconds.asc()).all()
-        if len(all_records) > 10:
-            record_to_remove = all_records[-1]
-            db.session.delete(record_to_remove)
-            db.session.commit()
-        
-        current_user.coins += 985
-        db.session.commit()
+    improved, in_top = submit_record(current_user, milliseconds, difficulty)
 
+    if in_top:
         return jsonify({'message': 'New record submitted and is in the top 10!'}), 201
     else:
         return jsonify({'message': 'New record submitted, but it is not in the top 10.'}), 200
 
 
+@game_bp.route("/new_records", methods=['POST'])
+@cached_user_required
+def new_records(current_user):
+    data = request.get_json()
+    if not isinstance(data, list) or not 0 < len(data) <= MAX_BATCH_RUNS:
+        return jsonify({'message': f'Invalid data. Requires: array of 1-{MAX_BATCH_RUNS} runs'}), 400
+
+    if not current_user.is_verified:
+        return jsonify({'message': 'User is not verified'}), 400
+
+    runs = []
+    best = {}
+    for index, run in enumerate(data):
+        try:
+            milliseconds = int(run.get('milliseconds'))
+            difficulty = Difficulty(run.get('difficulty').lower())
+            played_at = datetime.datetime.fromisoformat(run['played_at']) if run.get('played_at') else None
+        except (ValueError, KeyError, TypeError, AttributeError):
+            runs.append(None)
+            continue
+
+        if played_at is not None:
+            # в журнале время локальное и без зоны, как created_at; из будущего не принимаем
+            if played_at.tzinfo is not None:
+                played_at = played_at.astimezone().replace(tzinfo=None)
+            played_at = min(played_at, datetime.datetime.now())
+        runs.append((milliseconds, difficulty, played_at))
+        # при равном времени засчитываем более ранний забег
+        key = (milliseconds, played_at.timestamp() if played_at else float('inf'), index)
+        if difficulty not in best or key < best[difficulty]:
+            best[difficulty] = key
+
+    best_runs = {difficulty: key[0] for difficulty, key in best.items()}
+    history = [(difficulty, milliseconds, played_at) for milliseconds, difficulty, played_at in filter(None, runs)]
+    results = submit_records(current_user, best_runs, history) if best else {}
+
+    response = []
+    for index, run in enumerate(runs):
+        if run is None:
+            response.append({'index': index, 'status': 'invalid'})
+            continue
+
+        milliseconds, difficulty, played_at = run
+        if best[difficulty][2] != index:
+            response.append({'index': index, 'status': 'superseded'})
+            continue
+
+        improved, in_top = results[difficulty]
+        response.append({'index': index, 'status': 'accepted', 'improved': improved, 'in_top': in_top})
+
+    return jsonify({'results': response}), 200
+
+
 @game_bp.route("/get_records", methods=['GET'])
+@read_only
 def get_records():
-    all_results = {}
-    for difficulty in Difficulty:
-        top_10 = Leaderboard.query.filter_by(difficulty=difficulty).order_by(Leaderboard.milliseconds.asc()).limit(11).all()
-        all_results[difficulty.value] = [record.to_dict() for record in top_10]
+    version, body, etag = records_cache.get()
+    if body is None:
+        all_results = {}
+        for difficulty in Difficulty:
+            query = leaderboard_schema.select('public').where(Leaderboard.difficulty == difficulty).order_by(Leaderboard.milliseconds.asc()).limit(11)
+            all_results[difficulty.value] = leaderboard_schema.rows(db.session.execute(query), 'public')
+        body = dumps(all_results)
+        etag = records_cache.store(version, body)
+
+    response = current_app.response_class(body, status=200, mimetype='application/json')
+    response.set_etag(etag)
+    response.headers['Cache-Control'] = 'no-cache'
+    return response.make_conditional(request)
 
-    return jsonify(all_results), 200
+
+@game_bp.route("/get_period_records", methods=['GET'])
+@read_only
+def get_period_records():
+    kind = request.args.get('period', '').lower()
+    difficulty = _difficulty_arg()
+    if kind not in PERIODS or difficulty is None:
+        return jsonify({'message': f'Invalid data. Requires: period ({", ".join(PERIODS)}), difficulty (easy, medium, hard)'}), 400
+    try:
+        day = datetime.date.fromisoformat(request.args['date']) if request.args.get('date') else datetime.date.today()
+    except ValueError:
+        return jsonify({'message': 'Invalid data. Date must be YYYY-MM-DD'}), 400
+    if day > datetime.date.today():
+        return jsonify({'message': 'Invalid data. Date is in the future'}), 400
+
+    period = period_key(kind, day)
+    version, body, etag = period_board_cache.get(period, difficulty)
+    if body is None:
+        body = dumps({'period': period, 'difficulty': difficulty.value, 'records': board_rows(period, difficulty, BOARD_SIZE)})
+        etag = period_board_cache.store(period, difficulty, version, body, is_frozen(period))
+
+    response = current_app.response_class(body, status=200, mimetype='application/json')
+    response.set_etag(etag)
+    response.headers['Cache-Control'] = 'no-cache'
+    return response.make_conditional(request)
+
+
+@game_bp.route("/records/stream", methods=['GET'])
+def records_stream():
+    subscriber = leaderboard_broadcaster.subscribe()
+    snapshot = format_event('snapshot', leaderboard_broadcaster.snapshot())
+
+    def generate():
+        try:
+            yield snapshot
+            while not subscriber.dropped:
+                try:
+                    yield subscriber.queue.get(timeout=SSE_HEARTBEAT)
+                except queue.Empty:
+                    yield ': keep-alive\n\n'
+        finally:
+            leaderboard_broadcaster.unsubscribe(subscriber)
+
+    response = Response(generate(), mimetype='text/event-stream')
+    response.headers['Cache-Control'] = 'no-cache'
+    response.headers['X-Accel-Buffering'] = 'no'
+    return response
 
 
 @game_bp.route("/get_personal_records", methods=['GET'])
-@token_required
-def get_personal_records(current_user):
-    records_list = []
-    records = Leaderboard.query.filter_by(user_id=current_user.id).all()
-    for record in records:
-        records_list.append({
-            'milliseconds': record.milliseconds,
-            'difficulty': record.difficulty.value
-        })
+@read_only
+@claims_required
+def get_personal_records(claims):
+    query = leaderboard_schema.select('personal').where(Leaderboard.user_id == claims['id'])
+    return json_response(leaderboard_schema.rows(db.session.execute(query), 'personal'))
+
+
+def _difficulty_arg():
+    try:
+        return Difficulty(request.args.get('difficulty', '').lower())
+    except ValueError:
+        return None
+
+
+@game_bp.route("/stats", methods=['GET'])
+@read_only
+def get_stats():
+    try:
+        today = datetime.date.today()
+        date_to = datetime.date.fromisoformat(request.args['to']) if request.args.get('to') else today
+        date_from = datetime.date.fromisoformat(request.args['from']) if request.args.get('from') else date_to - datetime.timedelta(days=STATS_DEFAULT_DAYS - 1)
+    except ValueError:
+        return jsonify({'message': 'Invalid data. Dates must be YYYY-MM-DD'}), 400
+    if date_from > date_to or (date_to - date_from).days >= STATS_MAX_DAYS:
+        return jsonify({'message': f'Invalid data. Requires: from <= to, at most {STATS_MAX_DAYS} days'}), 400
+
+    query = RunDailyStats.query.filter(RunDailyStats.day.between(date_from, date_to))
+    if request.args.get('difficulty'):
+        difficulty = _difficulty_arg()
+        if difficulty is None:
+            return jsonify({'message': 'Invalid data. Requires: difficulty (easy, medium, hard)'}), 400
+        query = query.filter(RunDailyStats.difficulty == difficulty)
+
+    rows = query.order_by(RunDailyStats.day, RunDailyStats.difficulty).all()
+    return json_response([row.to_dict() for row in rows])
+
+
+@game_bp.route("/percentile", methods=['GET'])
+def get_percentile():
+    difficulty = _difficulty_arg()
+    milliseconds = request.args.get('milliseconds', type=int)
+    if difficulty is None or milliseconds is None:
+        return jsonify({'message': 'Invalid data. Requires: difficulty (easy, medium, hard), milliseconds (integer)'}), 400
+
+    view = run_sketches.view(difficulty)
+    if not view.n:
+        return jsonify({'message': 'No runs for this difficulty'}), 404
+
+    # строго медленнее — все забеги правее milliseconds
+    return jsonify({
+        'runs': view.n,
+        'faster_than': round((1 - view.fraction_at_most(milliseconds)) * 100, 2)
+    }), 200
+
 
-    return jsonify(records_list), 200
+@game_bp.route("/distribution", methods=['GET'])
+def get_distribution():
+    difficulty = _difficulty_arg()
+    if difficulty is None:
+        return jsonify({'message': 'Invalid data. Requires: difficulty (easy, medium, hard)'}), 400
+
+    bins = max(1, min(request.args.get('bins', 20, type=int), MAX_HISTOGRAM_BINS))
+    view = run_sketches.view(difficulty)
+    return jsonify({
+        'runs': view.n,
+        'min': view.min,
+        'max': view.max,
+        'quantiles': {f'p{q}': view.quantile(q / 100) for q in (10, 25, 50, 75, 90, 99)},
+        'histogram': view.histogram(bins)
+    }), 200
+
+
+@game_bp.route("/get_rank", methods=['GET'])
+@claims_required
+def get_rank(claims):
+    difficulty = _difficulty_arg()
+    if difficulty is None:
+        return jsonify({'message': 'Invalid data. Requires: difficulty (easy, medium, hard)'}), 400
+
+    rank = rank_engine.rank(difficulty, claims['id'])
+    if rank is None:
+        return jsonify({'message': 'No record for this difficulty'}), 404
+
+    return jsonify(rank), 200
+
+
+@game_bp.route("/get_records_around", methods=['GET'])
+@claims_required
+def get_records_around(claims):
+    difficulty = _difficulty_arg()
+    if difficulty is None:
+        return jsonify({'message': 'Invalid data. Requires: difficulty (easy, medium, hard)'}), 400
+
+    radius = max(0, min(request.args.get('radius', 5, type=int), 50))
+    return jsonify(rank_engine.around(difficulty, claims['id'], radius)), 200
+
+
+@game_bp.route("/get_records_page", methods=['GET'])
+def get_records_page():
+    difficulty = _difficulty_arg()
+    if difficulty is None:
+        return jsonify({'message': 'Invalid data. Requires: difficulty (easy, medium, hard)'}), 400
+
+    limit = max(1, min(request.args.get('limit', 50, type=int), 100))
+    try:
+        after = decode_cursor(request.args['after']) if request.args.get('after') else None
+    except ValueError:
+        return jsonify({'message': 'Invalid cursor'}), 400
+
+    records = rank_engine.page(difficulty, after, limit)
+    next_cursor = records[-1]['cursor'] if len(records) == limit else None
+    return jsonify({'records': records, 'next': next_cursor}), 200
+
+
+def _cell_args(data, session):
+    row = int(data.get('row'))
+    col = int(data.get('col'))
+    if not (0 <= row < session.rows and 0 <= col < session.cols):
+        raise ValueError('cell out of board')
+    return row, col
+
+
+@game_bp.route("/start_game", methods=['POST'])
+@claims_required
+def start_game(claims):
+    data = request.get_json()
+    try:
+        difficulty = Difficulty(data.get('difficulty').lower())
+    except (ValueError, AttributeError):
+        return jsonify({'message': 'Invalid data. Requires: difficulty (easy, medium, hard)'}), 400
+
+    session = session_store.create(claims['id'], difficulty)
+    return jsonify({
+        'session_id': session.id,
+        'rows': session.rows,
+        'cols': session.cols,
+        'mines': session.mine_count
+    }), 201
+
+
+@game_bp.route("/reveal_cell", methods=['POST'])
+@cached_user_required
+def reveal_cell(current_user):
+    data = request.get_json()
+    session = session_store.get(data.get('session_id'), current_user.id)
+    if session is None:
+        return jsonify({'message': 'Game session not found'}), 404
+
+    with session.lock:
+        if session.status != 'playing':
+            return jsonify({'message': 'Game is already finished', 'status': session.status}), 400
+        try:
+            row, col = _cell_args(data, session)
+        except (TypeError, ValueError):
+            return jsonify({'message': 'Invalid data. Requires: session_id, row, col'}), 400
+
+        cells = session.reveal(row, col)
+        response = {'status': session.status, 'cells': cells}
+
+    if session.status == 'lost':
+        session_store.discard(session.id)
+        response['mines'] = session.mine_cells()
+    elif session.status == 'won':
+        session_store.discard(session.id)
+        # время считаем по серверным часам, а не по данным клиента
+        milliseconds = session.elapsed_ms()
+        response['milliseconds'] = milliseconds
+        if current_user.is_verified:
+            improved, in_top = submit_record(current_user, milliseconds, session.difficulty)
+            response['improved'] = improved
+            response['in_top'] = in_top
+
+    return jsonify(response), 200
+
+
+@game_bp.route("/flag_cell", methods=['POST'])
+@claims_required
+def flag_cell(claims):
+    data = request.get_json()
+    session = session_store.get(data.get('session_id'), claims['id'])
+    if session is None:
+        return jsonify({'message': 'Game session not found'}), 404
+
+    with session.lock:
+        try:
+            row, col = _cell_args(data, session)
+        except (TypeError, ValueError):
+            return jsonify({'message': 'Invalid data. Requires: session_id, row, col'}), 400
+        flagged = session.toggle_flag(row, col)
+
+    return jsonify({'flagged': flagged}), 200
 
 
 @game_bp.route("/open_mine", methods=['GET'])
-@token_required
-def open_mine(current_user):
+@claims_required
+@idempotent
+def open_mine(claims):
     try:
-        if current_user.coins >= 10:
-            current_user.coins -= 10
-            db.session.commit()
+        balance = debit(claims['id'], 10, 'open_mine')
+        db.session.commit()
+        if balance is not None:
+            user_cache.invalidate(claims['id'])
             return jsonify({"message": "ok"}), 201
         else: 
             return jsonify({"message": "neok"}), 200
     except Exception as err:
-        return jsonify({"error": err}), 400
+        db.session.rollback()
+        return jsonify({"error": f'{err}'}), 400
     
 
 @game_bp.route("/get_coins", methods=['GET'])
-@token_required
+@read_only
+@cached_user_required
 def get_coins(current_user):
     try:
         return jsonify({"coins": current_user.coins}), 200
@@ -113,23 +390,44 @@ def get_coins(current_user):
         return jsonify({"error": err}), 400 
     
 @game_bp.route("/get_available_bg", methods=['GET'])
-@token_required
-def get_available_bg(current_user):
+@read_only
+@claims_required
+def get_available_bg(claims):
     try:
-        return jsonify({"available_bg": current_user.available_bg}), 200
+        owned = db.session.query(UserBackground.background_id).filter_by(user_id=claims['id']).order_by(UserBackground.background_id).all()
+        return jsonify({"available_bg": ''.join(f'{background_id},' for background_id, in owned)}), 200
     except Exception as err:
         return jsonify({"error": err}), 400
+
+
+@game_bp.route("/get_backgrounds", methods=['GET'])
+@read_only
+def get_backgrounds():
+    backgrounds = Background.query.order_by(Background.id).all()
+    return jsonify([background.to_dict() for background in backgrounds]), 200
+
     
 @game_bp.route("/add_bg", methods=['POST'])
-@token_required
-def add_bg(current_user):
+@claims_required
+@idempotent
+def add_bg(claims):
     try:
         data = request.get_json()
-        current_user.available_bg += f"{data.get('id')},"
-        current_user.coins -= data.get('price')
+        background = db.session.get(Background, int(data.get('id')))
+        if not background:
+            return jsonify({"message": "Background not found"}), 404
+
+        if db.session.get(UserBackground, (claims['id'], background.id)):
+            return jsonify({"message": "Background already owned"}), 400
+
+        if debit(claims['id'], background.price, 'add_bg') is None:
+            db.session.rollback()
+            return jsonify({"message": "neok"}), 200
+
+        db.session.add(UserBackground(user_id=claims['id'], background_id=background.id))
         db.session.commit()
+        user_cache.invalidate(claims['id'])
         return jsonify({"message": "ok"}), 201
     except Exception as err:
-        return jsonify({"error": err}), 400
-        
-        
+        db.session.rollback()
+        return jsonify({"error": f'{err}'}), 400
@@ -1,3 +1,12 @@
-from app.utils.auth import token_required, admin_required
-from app.utils.email import generate_verification_code, send_verification
-from app.utils.token import generate_token, verify_token 
\ No newline at end of file
+from app.utils.auth import token_required, cached_user_required, claims_required, admin_required
+from app.utils.email import generate_verification_code, send_verification, mailer
+from app.utils.token import generate_token, generate_refresh_token, verify_token
+from app.utils.records_cache import records_cache
+from app.utils.records import submit_record, submit_records, run_history
+from app.utils.rank_index import rank_engine
+from app.utils.user_cache import user_cache
+from app.utils.passwords import password_hasher
+from app.utils.coins import credit, debit, ledger_writer
+from app.utils.revocation import revocation_list
+from app.utils.quantiles import run_sketches
+from app.utils.idempotency import idempotent, idempotency_store
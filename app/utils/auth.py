@@ -1,27 +1,61 @@
 from functools import wraps
-from flask import request, jsonify
+from flask import request, jsonify, g
 from app.models import User
 from app.utils.token import verify_token
+from app.utils.user_cache import user_cache
 import base64
 import os
 
 
+def _decode_request_token():
+    token = None
+    if 'x-access-token' in request.headers:
+        token = request.headers['x-access-token']
+
+    if not token:
+        return None, (jsonify({'message': 'Token is missing!'}), 401)
+
+    data = verify_token(token)
+    if isinstance(data, str):
+        return None, (jsonify({'message': data}), 401)
+
+    g.user_id = data['id']
+    return data, None
+
+
 def token_required(f):
     @wraps(f)
     def decorated(*args, **kwargs):
-        token = None
-        if 'x-access-token' in request.headers:
-            token = request.headers['x-access-token']
+        try:
+            data, error = _decode_request_token()
+            if error:
+                return error
+
+            current_user = User.query.filter_by(id=data['id']).first()
+
+        except:
+            return jsonify({'message': 'Token is invalid!'}), 401
+
+        return f(current_user, *args, **kwargs)
+
+    return decorated
 
-        if not token:
-            return jsonify({'message': 'Token is missing!'}), 401
 
+def cached_user_required(f):
+    # только для чтения: отдаёт снимок пользователя из user_cache без SELECT
+    @wraps(f)
+    def decorated(*args, **kwargs):
         try:
-            data = verify_token(token)
-            if isinstance(data, str):
-                return jsonify({'message': data}), 401
+            data, error = _decode_request_token()
+            if error:
+                return error
 
-            current_user = User.query.filter_by(id=data['id']).first()
+            current_user = user_cache.get(data['id'])
+            if current_user is None:
+                user = User.query.filter_by(id=data['id']).first()
+                if not user:
+                    return jsonify({'message': 'Token is invalid!'}), 401
+                current_user = user_cache.put(user)
 
         except:
             return jsonify({'message': 'Token is invalid!'}), 401
@@ -31,6 +65,22 @@ def token_required(f):
     return decorated
 
 
+def claims_required(f):
+    @wraps(f)
+    def decorated(*args, **kwargs):
+        try:
+            claims, error = _decode_request_token()
+            if error:
+                return error
+
+        except:
+            return jsonify({'message': 'Token is invalid!'}), 401
+
+        return f(claims, *args, **kwargs)
+
+    return decorated
+
+
 def admin_required(f):
     @wraps(f)
     @token_required
@@ -44,4 +94,4 @@ def admin_required(f):
 
 
 def generate_secret():
-    return base64.b32encode(os.urandom(10)).decode('utf-8')
\ No newline at end of file
+    return base64.b32encode(os.urandom(10)).decode('utf-8')
@@ -0,0 +1,109 @@
+import json
+import queue
+import threading
+import time
+from app.models import Difficulty
+from app.utils.rank_index import rank_engine
+
+
+TOP_LIST_SIZE = 11
+
+
+def format_event(event, data):
+    return f'event: {event}\ndata: {json.dumps(data)}\n\n'
+
+
+def _top_list(difficulty):
+    rows = rank_engine.page(difficulty, None, TOP_LIST_SIZE)
+    return [{key: value for key, value in row.items() if key != 'cursor'} for row in rows]
+
+
+class Subscriber:
+    __slots__ = ('queue', 'dropped')
+
+    def __init__(self, maxsize):
+        self.queue = queue.Queue(maxsize=maxsize)
+        self.dropped = False
+
+
+class LeaderboardBroadcaster:
+    def __init__(self, buffer_size=32, poll_interval=5):
+        self.buffer_size = buffer_size
+        self.poll_interval = poll_interval
+        self.dropped = 0
+        self._app = None
+        self._subscribers = set()
+        self._snapshots = {}  # difficulty -> {user_id: row}
+        self._lock = threading.Lock()
+        self._thread = None
+
+    def init_app(self, app):
+        self._app = app
+
+    def _start(self):
+        # опрос нужен, чтобы доставлять изменения, записанные другими воркерами
+        if self._thread is None and self._app is not None:
+            self._thread = threading.Thread(target=self._run, name='leaderboard-broadcaster', daemon=True)
+            self._thread.start()
+
+    def _run(self):
+        while True:
+            time.sleep(self.poll_interval)
+            if not self._subscribers:
+                continue
+            try:
+                with self._app.app_context():
+                    for difficulty in Difficulty:
+                        self.publish(difficulty)
+            except Exception as e:
+                print(f"Error polling leaderboard: {e}")
+
+    def subscribe(self):
+        subscriber = Subscriber(self.buffer_size)
+        with self._lock:
+            self._subscribers.add(subscriber)
+            self._start()
+        return subscriber
+
+    def unsubscribe(self, subscriber):
+        with self._lock:
+            self._subscribers.discard(subscriber)
+
+    def snapshot(self):
+        result = {}
+        for difficulty in Difficulty:
+            top = _top_list(difficulty)
+            with self._lock:
+                self._snapshots.setdefault(difficulty, {row['user_id']: row for row in top})
+            result[difficulty.value] = top
+        return result
+
+    def publish(self, difficulty):
+        top = _top_list(difficulty)
+        current = {row['user_id']: row for row in top}
+        with self._lock:
+            previous = self._snapshots.get(difficulty)
+            self._snapshots[difficulty] = current
+            if previous is None or not self._subscribers:
+                return
+
+            changed = [row for user_id, row in current.items() if previous.get(user_id) != row]
+            removed = [user_id for user_id in previous if user_id not in current]
+            if not changed and not removed:
+                return
+
+            event = format_event('update', {'difficulty': difficulty.value, 'changed': changed, 'removed': removed})
+            for subscriber in list(self._subscribers):
+                try:
+                    subscriber.queue.put_nowait(event)
+                except queue.Full:
+                    # медленный клиент: отключаем, а не копим для него события
+                    subscriber.dropped = True
+                    self._subscribers.discard(subscriber)
+                    self.dropped += 1
+
+    def stats(self):
+        return {'subscribers': len(self._subscribers), 'dropped': self.dropped}
+
+
+leaderboard_broadcaster = LeaderboardBroadcaster()
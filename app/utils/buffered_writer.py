@@ -0,0 +1,54 @@
+import atexit
+import threading
+from app import db
+
+
+class BufferedWriter:
+    # копит строки в памяти и пишет их пачкой из фонового потока
+    name = 'buffered-writer'
+
+    def __init__(self, flush_interval=1.0, max_batch=500):
+        self.flush_interval = flush_interval
+        self.max_batch = max_batch
+        self._app = None
+        self._buffer = []
+        self._lock = threading.Lock()
+        self._wakeup = threading.Event()
+        self._thread = None
+
+    def init_app(self, app):
+        self._app = app
+        if self._thread is None:
+            self._thread = threading.Thread(target=self._run, name=self.name, daemon=True)
+            self._thread.start()
+            atexit.register(self.flush)
+
+    def append(self, entries):
+        with self._lock:
+            self._buffer.extend(entries)
+            if len(self._buffer) >= self.max_batch:
+                self._wakeup.set()
+
+    def write(self, rows):
+        raise NotImplementedError
+
+    def flush(self):
+        with self._lock:
+            rows, self._buffer = self._buffer, []
+        if not rows or self._app is None:
+            return
+        with self._app.app_context():
+            try:
+                self.write(rows)
+                db.session.commit()
+            except Exception as e:
+                db.session.rollback()
+                print(f"Error writing {self.name}: {e}")
+                with self._lock:
+                    self._buffer[:0] = rows
+
+    def _run(self):
+        while True:
+            self._wakeup.wait(self.flush_interval)
+            self._wakeup.clear()
+            self.flush()
@@ -0,0 +1,54 @@
+import datetime
+from sqlalchemy import event, insert, update
+from sqlalchemy.orm import Session
+from app import db
+from app.models import User, CoinLedger
+from app.utils.buffered_writer import BufferedWriter
+
+
+class LedgerWriter(BufferedWriter):
+    name = 'coin-ledger'
+
+    def write(self, rows):
+        db.session.execute(insert(CoinLedger), rows)
+
+
+ledger_writer = LedgerWriter()
+
+
+def _change(user_id, delta, reason, condition=None):
+    stmt = update(User).where(User.id == user_id)
+    if condition is not None:
+        stmt = stmt.where(condition)
+    stmt = stmt.values(coins=User.coins + delta).returning(User.coins)
+    balance = db.session.execute(stmt).scalar()
+    if balance is not None:
+        # в журнал попадёт только после commit, см. _after_commit
+        db.session.info.setdefault('coin_ledger', []).append({
+            'user_id': user_id,
+            'delta': delta,
+            'balance': balance,
+            'reason': reason,
+            'created_at': datetime.datetime.now()
+        })
+    return balance
+
+
+def credit(user_id, amount, reason):
+    return _change(user_id, amount, reason)
+
+
+def debit(user_id, amount, reason):
+    return _change(user_id, -amount, reason, User.coins >= amount)
+
+
+@event.listens_for(Session, 'after_commit')
+def _after_commit(session):
+    entries = session.info.pop('coin_ledger', None)
+    if entries:
+        ledger_writer.append(entries)
+
+
+@event.listens_for(Session, 'after_rollback')
+def _after_rollback(session):
+    session.info.pop('coin_ledger', None)
@@ -1,26 +1,135 @@
+import queue
 import random
-import smtplib
-from email.mime.text import MIMEText
-from email.header import Header
-from config import SENDER_MAIL, SENDER_PASSWORD
+import threading
+from collections import deque
+from config import SENDER_MAIL, SENDER_PASSWORD, SMTP_HOST, SMTP_PORT, SMTP_SSL
+from app.utils.lazy_import import lazy_import
+
+smtplib = lazy_import('smtplib')
 
 
 def generate_verification_code():
     return str(random.randint(100000, 999999))
 
 
-def send_verification(recipient_email, verification_code):
+class Mailer:
+    def __init__(self, workers=2, maxsize=1000, retries=3, backoff=1.0, idle_timeout=30):
+        self.workers = workers
+        self.retries = retries
+        self.backoff = backoff
+        self.idle_timeout = idle_timeout
+        self.sent = 0
+        self.dead_letters = deque(maxlen=1000)
+        self._queue = queue.Queue(maxsize=maxsize)
+        self._threads = []
+        self._lock = threading.Lock()
+        self._pending_retries = 0  # повторы, которые ждут своего Timer и ещё не в очереди
+        self._retries_changed = threading.Condition()
+
+    def _start(self):
+        with self._lock:
+            if self._threads:
+                return
+            for i in range(self.workers):
+                thread = threading.Thread(target=self._run, name=f'mailer-{i}', daemon=True)
+                thread.start()
+                self._threads.append(thread)
+
+    def enqueue(self, recipient, msg, block=False):
+        # block=True для массовых рассылок: ждём место в очереди вместо отбрасывания письма
+        self._start()
+        try:
+            self._queue.put((recipient, msg.as_string(), 0), block=block)
+            return True
+        except queue.Full:
+            print(f"Error sending email: mail queue is full, dropping message to {recipient}")
+            return False
+
+    def join(self):
+        # пустая очередь ещё не значит, что всё отправлено: повторы могут ждать своего Timer
+        while True:
+            self._queue.join()
+            with self._retries_changed:
+                self._retries_changed.wait_for(lambda: not self._pending_retries or self._queue.unfinished_tasks)
+                if not self._pending_retries and not self._queue.unfinished_tasks:
+                    return
+
+    def _connect(self):
+        if SMTP_SSL:
+            server = smtplib.SMTP_SSL(SMTP_HOST, SMTP_PORT)
+        else:
+            server = smtplib.SMTP(SMTP_HOST, SMTP_PORT)
+        if SENDER_PASSWORD:
+            server.login(SENDER_MAIL, SENDER_PASSWORD)
+        return server
+
+    def _close(self, server):
+        try:
+            server.quit()
+        except Exception:
+            pass
+
+    def _run(self):
+        server = None
+        while True:
+            try:
+                recipient, message, attempt = self._queue.get(timeout=self.idle_timeout)
+            except queue.Empty:
+                # не держим соединение, которое SMTP-сервер всё равно закроет по таймауту
+                if server is not None:
+                    self._close(server)
+                    server = None
+                continue
+
+            try:
+                if server is None:
+                    server = self._connect()
+                server.sendmail(SENDER_MAIL, recipient, message)
+                with self._lock:
+                    self.sent += 1
+            except Exception as e:
+                if server is not None:
+                    self._close(server)
+                    server = None
+                self._retry(recipient, message, attempt, e)
+            finally:
+                self._queue.task_done()
+
+    def _retry(self, recipient, message, attempt, error):
+        if attempt + 1 >= self.retries:
+            print(f"Error sending email: {error}")
+            self.dead_letters.append((recipient, message, str(error)))
+            return
+
+        def requeue():
+            try:
+                self._queue.put_nowait((recipient, message, attempt + 1))
+            except queue.Full:
+                self.dead_letters.append((recipient, message, 'mail queue is full'))
+            finally:
+                with self._retries_changed:
+                    self._pending_retries -= 1
+                    self._retries_changed.notify_all()
+
+        # счётчик растёт до task_done этой попытки, поэтому join не проскочит между ними
+        with self._retries_changed:
+            self._pending_retries += 1
+        timer = threading.Timer(self.backoff * 2 ** attempt, requeue)
+        timer.daemon = True
+        timer.start()
+
+
+mailer = Mailer()
+
+
+def send_verification(recipient_email, verification_code, block=False):
     subject = "Подтверждение почты в сапёре"
     text = f"Ваш код подтверждения: {verification_code}"
 
+    from email.header import Header
+    from email.mime.text import MIMEText
+
     msg = MIMEText(text, 'plain', 'utf-8')
     msg['Subject'] = Header(subject, 'utf-8')
 
-    try:
-        with smtplib.SMTP_SSL('smtp.gmail.com', 465) as server:
-            server.login(SENDER_MAIL, SENDER_PASSWORD)
-            server.sendmail(SENDER_MAIL, recipient_email, msg.as_string())
-        return True
-    except Exception as e:
-        print(f"Error sending email: {e}")
-        return False 
\ No newline at end of file
+    return mailer.enqueue(recipient_email, msg, block)
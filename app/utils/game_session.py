@@ -0,0 +1,176 @@
+import secrets
+import threading
+import time
+from app.models import Difficulty
+from app.utils.lazy_import import lazy_import
+
+np = lazy_import('numpy')
+
+
+BOARD_SIZES = {
+    Difficulty.easy: (9, 9, 10),
+    Difficulty.medium: (16, 16, 40),
+    Difficulty.hard: (16, 30, 99)
+}
+
+
+def _neighbours_sum(mask):
+    padded = np.pad(mask.astype(np.uint8), 1)
+    rows, cols = mask.shape
+    total = np.zeros(mask.shape, dtype=np.uint8)
+    for dr in (0, 1, 2):
+        for dc in (0, 1, 2):
+            if dr != 1 or dc != 1:
+                total += padded[dr:dr + rows, dc:dc + cols]
+    return total
+
+
+def _dilate(mask):
+    padded = np.pad(mask, 1)
+    rows, cols = mask.shape
+    result = mask.copy()
+    for dr in (0, 1, 2):
+        for dc in (0, 1, 2):
+            result |= padded[dr:dr + rows, dc:dc + cols]
+    return result
+
+
+class GameSession:
+    __slots__ = (
+        'id', 'user_id', 'difficulty', 'seed', 'rows', 'cols', 'mine_count',
+        'mines', 'revealed', 'flagged', 'status', 'started_at', 'finished_at', 'touched_at', 'lock'
+    )
+
+    def __init__(self, user_id, difficulty, seed=None):
+        self.id = secrets.token_urlsafe(12)
+        self.user_id = user_id
+        self.difficulty = difficulty
+        self.seed = seed if seed is not None else secrets.randbits(64)
+        self.rows, self.cols, self.mine_count = BOARD_SIZES[difficulty]
+        cells = self.rows * self.cols
+        # поля храним упакованными битсетами: бит на клетку
+        self.mines = None
+        self.revealed = np.zeros((cells + 7) // 8, dtype=np.uint8)
+        self.flagged = np.zeros((cells + 7) // 8, dtype=np.uint8)
+        self.status = 'playing'
+        self.started_at = None
+        self.finished_at = None
+        self.touched_at = time.monotonic()
+        self.lock = threading.Lock()
+
+    def _unpack(self, bits):
+        return np.unpackbits(bits, count=self.rows * self.cols).astype(bool).reshape(self.rows, self.cols)
+
+    def _pack(self, mask):
+        return np.packbits(mask.ravel())
+
+    def _place_mines(self, row, col):
+        # мины расставляются при первом ходе, чтобы первый клик был безопасным
+        rng = np.random.default_rng(self.seed)
+        safe = np.zeros((self.rows, self.cols), dtype=bool)
+        safe[max(row - 1, 0):row + 2, max(col - 1, 0):col + 2] = True
+        candidates = np.flatnonzero(~safe.ravel())
+        mines = np.zeros(self.rows * self.cols, dtype=bool)
+        mines[rng.choice(candidates, self.mine_count, replace=False)] = True
+        self.mines = np.packbits(mines)
+
+    def _cells(self, mask, counts):
+        positions = np.argwhere(mask)
+        return [[int(r), int(c), int(counts[r, c])] for r, c in positions]
+
+    def reveal(self, row, col):
+        if self.mines is None:
+            self._place_mines(row, col)
+            self.started_at = time.time()
+
+        mines = self._unpack(self.mines)
+        revealed = self._unpack(self.revealed)
+        flagged = self._unpack(self.flagged)
+        if revealed[row, col] or flagged[row, col]:
+            return []
+
+        if mines[row, col]:
+            self.status = 'lost'
+            self.finished_at = time.time()
+            return []
+
+        counts = _neighbours_sum(mines)
+        region = np.zeros_like(mines)
+        region[row, col] = True
+        frontier = region
+        while True:
+            # флажок останавливает каскад: помеченную клетку открывает только явный ход
+            grown = _dilate(frontier & (counts == 0)) & ~mines & ~revealed & ~flagged
+            new = grown & ~region
+            if not new.any():
+                break
+            region |= new
+            frontier = new
+
+        revealed |= region
+        self.revealed = self._pack(revealed)
+        if revealed.sum() == self.rows * self.cols - self.mine_count:
+            self.status = 'won'
+            self.finished_at = time.time()
+        return self._cells(region, counts)
+
+    def toggle_flag(self, row, col):
+        flagged = self._unpack(self.flagged)
+        if self._unpack(self.revealed)[row, col]:
+            return bool(flagged[row, col])
+        flagged[row, col] = not flagged[row, col]
+        self.flagged = self._pack(flagged)
+        return bool(flagged[row, col])
+
+    def mine_cells(self):
+        if self.mines is None:
+            return []
+        return np.argwhere(self._unpack(self.mines)).tolist()
+
+    def elapsed_ms(self):
+        if self.started_at is None or self.finished_at is None:
+            return None
+        return int((self.finished_at - self.started_at) * 1000)
+
+
+class SessionStore:
+    def __init__(self, ttl=3600, maxsize=100000):
+        self.ttl = ttl
+        self.maxsize = maxsize
+        self._sessions = {}
+        self._lock = threading.Lock()
+
+    def _evict(self, now):
+        expired = [key for key, session in self._sessions.items() if now - session.touched_at > self.ttl]
+        for key in expired:
+            del self._sessions[key]
+
+    def create(self, user_id, difficulty, seed=None):
+        session = GameSession(user_id, difficulty, seed)
+        with self._lock:
+            if len(self._sessions) >= self.maxsize:
+                self._evict(time.monotonic())
+                if len(self._sessions) >= self.maxsize:
+                    oldest = min(self._sessions.values(), key=lambda s: s.touched_at)
+                    del self._sessions[oldest.id]
+            self._sessions[session.id] = session
+        return session
+
+    def get(self, session_id, user_id):
+        now = time.monotonic()
+        with self._lock:
+            session = self._sessions.get(session_id)
+            if session is None or session.user_id != user_id:
+                return None
+            if now - session.touched_at > self.ttl:
+                del self._sessions[session_id]
+                return None
+            session.touched_at = now
+            return session
+
+    def discard(self, session_id):
+        with self._lock:
+            self._sessions.pop(session_id, None)
+
+
+session_store = SessionStore()
@@ -0,0 +1,235 @@
+import hashlib
+import threading
+import time
+from collections import OrderedDict
+from datetime import datetime, timedelta, timezone
+from functools import wraps
+from flask import request, jsonify, g, current_app
+from sqlalchemy import delete, update
+from app import db
+from app.models import IdempotencyRecord
+from app.utils.upsert import dialect_insert
+
+
+MAX_KEY_LENGTH = 100
+
+
+class StoredResponse:
+    __slots__ = ('fingerprint', 'status', 'mimetype', 'body')
+
+    def __init__(self, fingerprint, status, mimetype, body):
+        self.fingerprint = fingerprint
+        self.status = status
+        self.mimetype = mimetype
+        self.body = body
+
+
+class IdempotencyStore:
+    # память — основной уровень; БД (по желанию) нужна, чтобы повтор, попавший в другой воркер, тоже получил сохранённый ответ
+    def __init__(self, ttl=86400, max_bytes=32 * 1024 * 1024, wait_timeout=10, lock_timeout=30, purge_interval=300):
+        self.ttl = ttl
+        self.max_bytes = max_bytes
+        self.wait_timeout = wait_timeout
+        self.lock_timeout = lock_timeout
+        self.purge_interval = purge_interval
+        self.use_db = False
+        self.replays = 0
+        self.coalesced = 0
+        self._entries = OrderedDict()  # key -> (expires_at, StoredResponse)
+        self._bytes = 0
+        self._inflight = {}  # key -> threading.Event
+        self._purged_at = None
+        self._lock = threading.Lock()
+
+    def init_app(self, app):
+        self.ttl = app.config.get('IDEMPOTENCY_TTL', self.ttl)
+        self.max_bytes = app.config.get('IDEMPOTENCY_MAX_BYTES', self.max_bytes)
+        self.use_db = app.config.get('IDEMPOTENCY_DB', False)
+
+    def _get(self, key):
+        entry = self._entries.get(key)
+        if entry is None:
+            return None
+        if entry[0] < time.monotonic():
+            self._drop(key)
+            return None
+        self._entries.move_to_end(key)
+        return entry[1]
+
+    def _drop(self, key):
+        _, stored = self._entries.pop(key)
+        self._bytes -= len(stored.body)
+
+    def _put(self, key, stored, ttl):
+        with self._lock:
+            if key in self._entries:
+                self._drop(key)
+            self._entries[key] = (time.monotonic() + ttl, stored)
+            self._bytes += len(stored.body)
+            while self._bytes > self.max_bytes and self._entries:
+                self._drop(next(iter(self._entries)))
+
+    def begin(self, key, fingerprint):
+        # -> ('replay', StoredResponse) | ('run', None) | ('busy', None)
+        with self._lock:
+            stored = self._get(key)
+            if stored is not None:
+                return 'replay', stored
+            event = self._inflight.get(key)
+            if event is None:
+                self._inflight[key] = threading.Event()
+        if event is not None:
+            # такой же запрос уже выполняется в этом процессе — ждём его ответа
+            self.coalesced += 1
+            event.wait(self.wait_timeout)
+            with self._lock:
+                stored = self._get(key)
+            return ('replay', stored) if stored is not None else ('busy', None)
+
+        if not self.use_db:
+            return 'run', None
+        try:
+            state, stored = self._claim(key, fingerprint)
+        except Exception:
+            self._release(key)
+            raise
+        if state != 'run':
+            self._release(key)
+        return state, stored
+
+    def _claim(self, key, fingerprint):
+        deadline = time.monotonic() + self.wait_timeout
+        while True:
+            now = datetime.now(timezone.utc)
+            stmt = dialect_insert(IdempotencyRecord.__table__).values(
+                key=key,
+                fingerprint=fingerprint,
+                expires_at=now + timedelta(seconds=self.lock_timeout)
+            ).on_conflict_do_nothing(index_elements=['key'])
+            claimed = db.session.execute(stmt).rowcount == 1
+            if not claimed:
+                # просроченная блокировка: воркер упал посреди запроса
+                claimed = db.session.execute(update(IdempotencyRecord).where(
+                    IdempotencyRecord.key == key,
+                    IdempotencyRecord.expires_at < now
+                ).values(
+                    fingerprint=fingerprint, status=None, mimetype=None, body=None,
+                    expires_at=now + timedelta(seconds=self.lock_timeout)
+                ).execution_options(synchronize_session=False)).rowcount == 1
+            db.session.commit()
+            if claimed:
+                return 'run', None
+
+            record = db.session.get(IdempotencyRecord, key, populate_existing=True)
+            db.session.rollback()
+            if record is not None and record.status is not None:
+                stored = StoredResponse(record.fingerprint, record.status, record.mimetype, record.body)
+                expires_at = record.expires_at if record.expires_at.tzinfo else record.expires_at.replace(tzinfo=timezone.utc)
+                self._put(key, stored, max(0, (expires_at - now).total_seconds()))
+                return 'replay', stored
+            if time.monotonic() >= deadline:
+                return 'busy', None
+            time.sleep(0.05)
+
+    def complete(self, key, stored):
+        self._put(key, stored, self.ttl)
+        try:
+            if self.use_db:
+                db.session.execute(update(IdempotencyRecord).where(IdempotencyRecord.key == key).values(
+                    status=stored.status,
+                    mimetype=stored.mimetype,
+                    body=stored.body,
+                    expires_at=datetime.now(timezone.utc) + timedelta(seconds=self.ttl)
+                ).execution_options(synchronize_session=False))
+                db.session.commit()
+                self._maybe_purge()
+        except Exception as e:
+            # запрос уже выполнен; ответ остаётся хотя бы в памяти этого воркера
+            db.session.rollback()
+            print(f"Error storing idempotent response: {e}")
+        finally:
+            self._release(key)
+
+    def abort(self, key):
+        try:
+            if self.use_db:
+                db.session.rollback()
+                db.session.execute(delete(IdempotencyRecord).where(
+                    IdempotencyRecord.key == key,
+                    IdempotencyRecord.status.is_(None)
+                ).execution_options(synchronize_session=False))
+                db.session.commit()
+        finally:
+            self._release(key)
+
+    def _release(self, key):
+        with self._lock:
+            event = self._inflight.pop(key, None)
+        if event is not None:
+            event.set()
+
+    def _maybe_purge(self):
+        now = time.monotonic()
+        if self._purged_at is not None and now - self._purged_at < self.purge_interval:
+            return
+        self._purged_at = now
+        db.session.execute(delete(IdempotencyRecord).where(
+            IdempotencyRecord.expires_at < datetime.now(timezone.utc)
+        ).execution_options(synchronize_session=False))
+        db.session.commit()
+
+    def stats(self):
+        with self._lock:
+            return {
+                'size': len(self._entries),
+                'bytes': self._bytes,
+                'max_bytes': self.max_bytes,
+                'inflight': len(self._inflight),
+                'replays': self.replays,
+                'coalesced': self.coalesced
+            }
+
+
+idempotency_store = IdempotencyStore()
+
+
+def _replay(stored):
+    idempotency_store.replays += 1
+    response = current_app.response_class(stored.body, status=stored.status, mimetype=stored.mimetype)
+    response.headers['Idempotent-Replayed'] = 'true'
+    return response
+
+
+def idempotent(f):
+    # ставится под декоратором авторизации: ключ действует в пределах пользователя и маршрута
+    @wraps(f)
+    def decorated(*args, **kwargs):
+        key = request.headers.get('Idempotency-Key')
+        if not key:
+            return f(*args, **kwargs)
+        if len(key) > MAX_KEY_LENGTH:
+            return jsonify({'message': f'Idempotency-Key must be at most {MAX_KEY_LENGTH} characters'}), 400
+
+        key = f'{g.user_id}:{request.endpoint}:{key}'
+        fingerprint = hashlib.sha1(request.method.encode() + b' ' + request.get_data()).hexdigest()
+        state, stored = idempotency_store.begin(key, fingerprint)
+        if state == 'busy':
+            return jsonify({'message': 'A request with this Idempotency-Key is still in progress'}), 409
+        if state == 'replay':
+            if stored.fingerprint != fingerprint:
+                return jsonify({'message': 'Idempotency-Key was already used with a different request'}), 422
+            return _replay(stored)
+
+        try:
+            response = current_app.make_response(f(*args, **kwargs))
+        except Exception:
+            idempotency_store.abort(key)
+            raise
+        # 5xx не запоминаем: клиент должен иметь возможность повторить запрос по-настоящему
+        if response.status_code >= 500 or response.is_streamed:
+            idempotency_store.abort(key)
+        else:
+            idempotency_store.complete(key, StoredResponse(fingerprint, response.status_code, response.mimetype, response.get_data()))
+        return response
+
+    return decorated
@@ -0,0 +1,55 @@
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from bcrypt import gensalt, hashpw
+from app import bcrypt
+
+
+class HasherBusy(Exception):
+    pass
+
+
+class PasswordHasher:
+    def __init__(self):
+        self.rounds = 12
+        self.timeout = 5
+        self._executor = None
+        self._slots = None
+
+    def init_app(self, app):
+        self.rounds = app.config.get('BCRYPT_LOG_ROUNDS', 12)
+        self.timeout = app.config.get('HASH_QUEUE_TIMEOUT', 5)
+        workers = app.config.get('HASH_WORKERS', 4)
+        self._executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix='bcrypt')
+        # рабочие + равное число ожидающих; остальные запросы получают 503, а не копятся в очереди
+        self._slots = threading.BoundedSemaphore(workers * 2)
+
+    def _run(self, fn, *args):
+        if not self._slots.acquire(timeout=self.timeout):
+            raise HasherBusy()
+        try:
+            future = self._executor.submit(fn, *args)
+        except Exception:
+            self._slots.release()
+            raise
+        future.add_done_callback(lambda _: self._slots.release())
+        return future.result()
+
+    def hash(self, password):
+        return self._run(bcrypt.generate_password_hash, password, self.rounds).decode('utf-8')
+
+    def check(self, hashed, password):
+        return self._run(bcrypt.check_password_hash, hashed, password)
+
+    def needs_rehash(self, hashed):
+        try:
+            return int(hashed.split('$')[2]) != self.rounds
+        except (IndexError, ValueError):
+            return True
+
+
+password_hasher = PasswordHasher()
+
+
+def hash_password(password, rounds):
+    # то же, что bcrypt.generate_password_hash, но без приложения: годится для ProcessPoolExecutor
+    return hashpw(password.encode('utf-8'), gensalt(rounds)).decode('utf-8')
@@ -0,0 +1,158 @@
+import datetime
+import hashlib
+import threading
+import time
+from collections import OrderedDict
+from sqlalchemy import delete, select
+from app import db
+from app.models import PeriodBoard
+from app.utils.upsert import dialect_insert
+
+
+BOARD_SIZE = 100
+PERIODS = ('day', 'week', 'season')
+
+
+def period_key(kind, day):
+    if kind == 'day':
+        return f'day:{day.isoformat()}'
+    if kind == 'week':
+        year, week, _ = day.isocalendar()
+        return f'week:{year}-W{week:02d}'
+    # сезон — календарный квартал
+    return f'season:{day.year}-Q{(day.month - 1) // 3 + 1}'
+
+
+def is_frozen(period, today=None):
+    # доска закрыта, если текущий период того же вида уже другой
+    today = today or datetime.date.today()
+    kind = period.split(':', 1)[0]
+    return period_key(kind, today) != period
+
+
+def _ordered(period, difficulty):
+    return select(PeriodBoard).where(
+        PeriodBoard.period == period,
+        PeriodBoard.difficulty == difficulty
+    ).order_by(PeriodBoard.milliseconds, PeriodBoard.created_at, PeriodBoard.user_id)
+
+
+def _threshold(period, difficulty):
+    # N-я строка доски: порог входа и кандидат на вытеснение; None, пока доска не заполнена
+    return db.session.execute(
+        _ordered(period, difficulty).with_only_columns(PeriodBoard.user_id, PeriodBoard.milliseconds)
+        .offset(BOARD_SIZE - 1).limit(1)
+    ).first()
+
+
+def _upsert(period, difficulty, user_id, username, milliseconds, created_at):
+    table = PeriodBoard.__table__
+    stmt = dialect_insert(table).values(
+        period=period,
+        difficulty=difficulty,
+        user_id=user_id,
+        username=username,
+        milliseconds=milliseconds,
+        created_at=created_at
+    )
+    stmt = stmt.on_conflict_do_update(
+        index_elements=['period', 'difficulty', 'user_id'],
+        set_={'milliseconds': stmt.excluded.milliseconds, 'created_at': stmt.excluded.created_at},
+        where=table.c.milliseconds > stmt.excluded.milliseconds
+    ).returning(table.c.user_id)
+    return db.session.execute(stmt).first() is not None
+
+
+def update_period_boards(user_id, username, milliseconds, difficulty, created_at):
+    # вызывается внутри транзакции submit_records под блокировкой сложности; возвращает изменённые доски
+    periods = [period_key(kind, created_at.date()) for kind in PERIODS]
+    # текущие места игрока на всех трёх досках одним запросом
+    current = dict(db.session.execute(select(PeriodBoard.period, PeriodBoard.milliseconds).where(
+        PeriodBoard.period.in_(periods),
+        PeriodBoard.difficulty == difficulty,
+        PeriodBoard.user_id == user_id
+    )).all())
+
+    changed = []
+    for period in periods:
+        if period in current:
+            # игрок уже на доске: размер не меняется, вытеснять некого
+            if milliseconds < current[period] and _upsert(period, difficulty, user_id, username, milliseconds, created_at):
+                changed.append((period, difficulty))
+            continue
+
+        threshold = _threshold(period, difficulty)
+        if threshold is not None and milliseconds >= threshold.milliseconds:
+            # день входит и в неделю, и в сезон: не попавший в дневной топ не попадёт и в них
+            if period == periods[0]:
+                break
+            continue
+        if not _upsert(period, difficulty, user_id, username, milliseconds, created_at):
+            continue
+        if threshold is not None:
+            # новичок на полной доске сдвигает бывшую N-ю строку на N+1-е место
+            db.session.execute(delete(PeriodBoard).where(
+                PeriodBoard.period == period,
+                PeriodBoard.difficulty == difficulty,
+                PeriodBoard.user_id == threshold.user_id
+            ).execution_options(synchronize_session=False))
+        changed.append((period, difficulty))
+    return changed
+
+
+def board_rows(period, difficulty, limit=BOARD_SIZE):
+    rows = db.session.execute(_ordered(period, difficulty).limit(limit)).scalars()
+    return [{
+        'rank': rank,
+        'user_id': row.user_id,
+        'username': row.username,
+        'milliseconds': row.milliseconds,
+        'created_at': row.created_at.isoformat()
+    } for rank, row in enumerate(rows, start=1)]
+
+
+class PeriodBoardCache:
+    # как records_cache, но по ключу (period, difficulty); прошедшие периоды уже не меняются и живут до вытеснения
+    def __init__(self, ttl=5, maxsize=1000):
+        self.ttl = ttl
+        self.maxsize = maxsize
+        self.hits = 0
+        self.misses = 0
+        self._entries = OrderedDict()  # (period, difficulty) -> (version, body, etag, stored_at, frozen)
+        self._versions = {}
+        self._lock = threading.Lock()
+
+    def get(self, period, difficulty):
+        key = (period, difficulty)
+        with self._lock:
+            version = self._versions.get(key, 0)
+            entry = self._entries.get(key)
+            if entry is not None and (entry[0] != version or (not entry[4] and time.monotonic() - entry[3] > self.ttl)):
+                del self._entries[key]
+                entry = None
+            if entry is None:
+                self.misses += 1
+                return version, None, None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return version, entry[1], entry[2]
+
+    def store(self, period, difficulty, version, body, frozen):
+        key = (period, difficulty)
+        etag = hashlib.sha1(body).hexdigest()
+        with self._lock:
+            if self._versions.get(key, 0) == version:
+                self._entries[key] = (version, body, etag, time.monotonic(), frozen)
+                self._entries.move_to_end(key)
+                while len(self._entries) > self.maxsize:
+                    self._entries.popitem(last=False)
+        return etag
+
+    def invalidate(self, period, difficulty):
+        key = (period, difficulty)
+        with self._lock:
+            self._versions[key] = self._versions.get(key, 0) + 1
+            self._entries.pop(key, None)
+
+
+period_board_cache = PeriodBoardCache()
@@ -0,0 +1,59 @@
+import threading
+import time
+from io import BytesIO
+from app.utils.lazy_import import lazy_import
+
+pyqrcode = lazy_import('pyqrcode')
+
+
+QR_FORMATS = {
+    'png': 'image/png',
+    'svg': 'image/svg+xml'
+}
+
+
+class QrCache:
+    def __init__(self, ttl=300, maxsize=1000):
+        self.ttl = ttl
+        self.maxsize = maxsize
+        self._entries = {}  # secret -> (expires_at, {(fmt, scale): bytes})
+        self._lock = threading.Lock()
+
+    def _evict(self, now):
+        for secret in [s for s, (expires_at, _) in self._entries.items() if expires_at < now]:
+            del self._entries[secret]
+
+    def has(self, secret):
+        with self._lock:
+            entry = self._entries.get(secret)
+            return entry is not None and entry[0] >= time.monotonic()
+
+    def get(self, secret, fmt, scale):
+        with self._lock:
+            entry = self._entries.get(secret)
+            if entry is None or entry[0] < time.monotonic():
+                return None
+            return entry[1].get((fmt, scale))
+
+    def put(self, secret, fmt, scale, image):
+        now = time.monotonic()
+        with self._lock:
+            if secret not in self._entries and len(self._entries) >= self.maxsize:
+                self._evict(now)
+                if len(self._entries) >= self.maxsize:
+                    return
+            entry = self._entries.setdefault(secret, (now + self.ttl, {}))
+            entry[1][(fmt, scale)] = image
+
+
+qr_cache = QrCache()
+
+
+def render_qr(uri, fmt='png', scale=8):
+    qr_code = pyqrcode.create(uri)
+    buffer = BytesIO()
+    if fmt == 'svg':
+        qr_code.svg(buffer, scale=scale)
+    else:
+        qr_code.png(buffer, scale=scale)
+    return buffer.getvalue()
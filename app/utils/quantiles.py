@@ -0,0 +1,236 @@
+import atexit
+import bisect
+import math
+import random
+import threading
+from datetime import datetime, timezone
+from sqlalchemy.exc import IntegrityError
+from app import db
+from app.models import Difficulty, Run, RunSketch
+
+
+class KllSketch:
+    # KLL: уровень h хранит элементы с весом 2**h, память O(k) при любом числе забегов
+    def __init__(self, k=200, c=2 / 3):
+        self.k = k
+        self.c = c
+        self.n = 0
+        self.min = None
+        self.max = None
+        self.compactors = [[]]
+        self._size = 0
+        self._max_size = self._capacity(0)
+        self._random = random.Random()
+
+    def _capacity(self, height):
+        depth = len(self.compactors) - height - 1
+        return int(math.ceil(self.k * self.c ** depth)) + 1
+
+    def _grow(self):
+        self.compactors.append([])
+        self._max_size = sum(self._capacity(height) for height in range(len(self.compactors)))
+
+    def _compress(self):
+        for height, items in enumerate(self.compactors):
+            if len(items) < self._capacity(height):
+                continue
+            if height + 1 == len(self.compactors):
+                self._grow()
+            items.sort()
+            # нечётный остаток (самый маленький элемент) остаётся на уровне
+            odd = len(items) % 2
+            self.compactors[height + 1].extend(items[odd + self._random.randint(0, 1)::2])
+            self.compactors[height] = items[:odd]
+            self._size = sum(len(level) for level in self.compactors)
+            if self._size < self._max_size:
+                return
+
+    def update(self, value):
+        self.compactors[0].append(value)
+        self.n += 1
+        self._size += 1
+        if self.min is None or value < self.min:
+            self.min = value
+        if self.max is None or value > self.max:
+            self.max = value
+        if self._size >= self._max_size:
+            self._compress()
+
+    def merge(self, other):
+        while len(self.compactors) < len(other.compactors):
+            self._grow()
+        for height, items in enumerate(other.compactors):
+            self.compactors[height].extend(items)
+        self.n += other.n
+        if other.min is not None:
+            self.min = other.min if self.min is None else min(self.min, other.min)
+            self.max = other.max if self.max is None else max(self.max, other.max)
+        self._size = sum(len(level) for level in self.compactors)
+        while self._size >= self._max_size:
+            self._compress()
+
+    def weighted_items(self):
+        for height, items in enumerate(self.compactors):
+            weight = 1 << height
+            for value in items:
+                yield value, weight
+
+    def to_dict(self):
+        return {'k': self.k, 'n': self.n, 'min': self.min, 'max': self.max, 'compactors': self.compactors}
+
+    @classmethod
+    def from_dict(cls, data):
+        sketch = cls(data['k'])
+        sketch.n = data['n']
+        sketch.min = data['min']
+        sketch.max = data['max']
+        for _ in range(len(data['compactors']) - 1):
+            sketch._grow()
+        sketch.compactors = [list(items) for items in data['compactors']]
+        sketch._size = sum(len(level) for level in sketch.compactors)
+        return sketch
+
+
+class SketchView:
+    # отсортированный срез скетча: rank и quantile за O(log k)
+    def __init__(self, sketches):
+        items = sorted(item for sketch in sketches for item in sketch.weighted_items())
+        self.values = [value for value, _ in items]
+        self.cumulative = []
+        total = 0
+        for _, weight in items:
+            total += weight
+            self.cumulative.append(total)
+        self.total = total
+        self.n = sum(sketch.n for sketch in sketches)
+        bounds = [sketch for sketch in sketches if sketch.n]
+        self.min = min(sketch.min for sketch in bounds) if bounds else None
+        self.max = max(sketch.max for sketch in bounds) if bounds else None
+
+    def fraction_at_most(self, value):
+        if not self.total:
+            return None
+        position = bisect.bisect_right(self.values, value)
+        return self.cumulative[position - 1] / self.total if position else 0.0
+
+    def quantile(self, q):
+        if not self.total:
+            return None
+        if q <= 0:
+            return self.min
+        if q >= 1:
+            return self.max
+        return self.values[min(bisect.bisect_left(self.cumulative, q * self.total), len(self.values) - 1)]
+
+    def histogram(self, bins):
+        if not self.total:
+            return []
+        width = max((self.max - self.min) / bins, 1)
+        result = []
+        previous = 0.0
+        for index in range(bins):
+            upper = self.min + width * (index + 1)
+            fraction = 1.0 if index == bins - 1 else self.fraction_at_most(upper)
+            result.append({
+                'from': round(self.min + width * index),
+                'to': round(upper),
+                'runs': round((fraction - previous) * self.n)
+            })
+            previous = fraction
+        return result
+
+
+class RunSketches:
+    # base: последний чекпоинт из БД (включает забеги всех воркеров), delta: забеги этого воркера после него
+    def __init__(self, k=200, checkpoint_interval=60):
+        self.k = k
+        self.checkpoint_interval = checkpoint_interval
+        self._app = None
+        self._base = {difficulty: KllSketch(k) for difficulty in Difficulty}
+        self._delta = {difficulty: KllSketch(k) for difficulty in Difficulty}
+        self._views = {}
+        self._lock = threading.Lock()
+        self._wakeup = threading.Event()
+        self._thread = None
+
+    def init_app(self, app):
+        self._app = app
+        if self._thread is None:
+            self._thread = threading.Thread(target=self._run, name='run-sketches', daemon=True)
+            self._thread.start()
+            atexit.register(self._flush_at_exit)
+
+    def warm(self):
+        # первый запуск: строим скетч по истории забегов, дальше живём только чекпоинтами
+        for difficulty in Difficulty:
+            if db.session.get(RunSketch, difficulty) is not None:
+                continue
+            sketch = KllSketch(self.k)
+            query = db.session.query(Run.milliseconds).filter(Run.difficulty == difficulty)
+            for milliseconds, in query.yield_per(10000):
+                sketch.update(milliseconds)
+            try:
+                db.session.add(RunSketch(difficulty=difficulty, data=sketch.to_dict(), updated_at=datetime.now(timezone.utc)))
+                db.session.commit()
+            except IntegrityError:
+                db.session.rollback()
+        self.checkpoint()
+
+    def add(self, difficulty, milliseconds):
+        with self._lock:
+            self._delta[difficulty].update(milliseconds)
+            self._views.pop(difficulty, None)
+
+    def checkpoint(self):
+        for difficulty in Difficulty:
+            with self._lock:
+                delta, self._delta[difficulty] = self._delta[difficulty], KllSketch(self.k)
+            try:
+                row = db.session.query(RunSketch).filter_by(difficulty=difficulty).with_for_update().first()
+                stored = KllSketch.from_dict(row.data) if row else KllSketch(self.k)
+                if delta.n:
+                    stored.merge(delta)
+                    if row is None:
+                        db.session.add(RunSketch(difficulty=difficulty, data=stored.to_dict(), updated_at=datetime.now(timezone.utc)))
+                    else:
+                        row.data = stored.to_dict()
+                        row.updated_at = datetime.now(timezone.utc)
+                db.session.commit()
+            except Exception:
+                db.session.rollback()
+                with self._lock:
+                    self._delta[difficulty].merge(delta)
+                raise
+            with self._lock:
+                self._base[difficulty] = stored
+                self._views.pop(difficulty, None)
+
+    def _checkpoint_in_app(self):
+        if self._app is None:
+            return
+        with self._app.app_context():
+            try:
+                self.checkpoint()
+            except Exception as e:
+                print(f"Error checkpointing run sketches: {e}")
+
+    def _flush_at_exit(self):
+        # CLI-команды и короткие процессы ничего не добавляли — не трогаем БД
+        if any(delta.n for delta in self._delta.values()):
+            self._checkpoint_in_app()
+
+    def _run(self):
+        while True:
+            self._wakeup.wait(self.checkpoint_interval)
+            self._wakeup.clear()
+            self._checkpoint_in_app()
+
+    def view(self, difficulty):
+        with self._lock:
+            view = self._views.get(difficulty)
+            if view is None:
+                view = self._views[difficulty] = SketchView([self._base[difficulty], self._delta[difficulty]])
+            return view
+
+
+run_sketches = RunSketches()
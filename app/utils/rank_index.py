@@ -0,0 +1,154 @@
+import bisect
+import datetime
+import threading
+import time
+from app import db
+from app.models import Leaderboard, Difficulty
+
+
+def _timestamp(created_at):
+    return created_at.timestamp() if created_at else 0.0
+
+
+class RankIndex:
+    def __init__(self):
+        self._keys = []  # отсортированные (milliseconds, created_at, user_id)
+        self._entries = {}  # user_id -> (key, username)
+
+    def __len__(self):
+        return len(self._keys)
+
+    def upsert(self, user_id, username, milliseconds, created_at):
+        key = (milliseconds, _timestamp(created_at), user_id)
+        old = self._entries.get(user_id)
+        if old is not None:
+            if old[0] == key:
+                return
+            del self._keys[bisect.bisect_left(self._keys, old[0])]
+        bisect.insort(self._keys, key)
+        self._entries[user_id] = (key, username)
+
+    def load(self, rows):
+        # прогрев: одна сортировка вместо insort на каждую строку
+        for user_id, username, milliseconds, created_at in rows:
+            self._entries[user_id] = ((milliseconds, _timestamp(created_at), user_id), username)
+        self._keys = sorted(key for key, _ in self._entries.values())
+
+    def rank(self, user_id):
+        entry = self._entries.get(user_id)
+        if entry is None:
+            return None
+        return bisect.bisect_left(self._keys, entry[0]) + 1
+
+    def _row(self, position):
+        milliseconds, created_at, user_id = key = self._keys[position]
+        return {
+            'rank': position + 1,
+            'user_id': user_id,
+            'username': self._entries[user_id][1],
+            'milliseconds': milliseconds,
+            'created_at': datetime.datetime.fromtimestamp(created_at).isoformat(),
+            'cursor': encode_cursor(key)
+        }
+
+    def around(self, user_id, radius):
+        rank = self.rank(user_id)
+        if rank is None:
+            return []
+        start = max(rank - 1 - radius, 0)
+        stop = min(rank + radius, len(self._keys))
+        return [self._row(position) for position in range(start, stop)]
+
+    def page(self, after, limit):
+        start = bisect.bisect_right(self._keys, after) if after else 0
+        stop = min(start + limit, len(self._keys))
+        return [self._row(position) for position in range(start, stop)]
+
+
+def encode_cursor(key):
+    return f'{key[0]}:{key[1]!r}:{key[2]}'
+
+
+def decode_cursor(cursor):
+    milliseconds, created_at, user_id = cursor.split(':')
+    return int(milliseconds), float(created_at), int(user_id)
+
+
+class RankEngine:
+    def __init__(self, refresh_interval=30, overlap=5):
+        self.refresh_interval = refresh_interval
+        self.overlap = datetime.timedelta(seconds=overlap)
+        self._indexes = {difficulty: RankIndex() for difficulty in Difficulty}
+        self._watermark = None
+        self._refreshed_at = None
+        self._lock = threading.RLock()
+
+    def warm(self):
+        with self._lock:
+            self._refreshed_at = None
+            self._sync()
+
+    def _sync(self):
+        # подтягиваем записи, сделанные другими воркерами, по created_at
+        now = time.monotonic()
+        if self._refreshed_at is not None and now - self._refreshed_at < self.refresh_interval:
+            return
+
+        query = db.session.query(
+            Leaderboard.user_id,
+            Leaderboard.username,
+            Leaderboard.milliseconds,
+            Leaderboard.created_at,
+            Leaderboard.difficulty
+        )
+        if self._watermark is not None:
+            query = query.filter(Leaderboard.created_at >= self._watermark - self.overlap)
+
+        if self._watermark is None:
+            rows = {difficulty: [] for difficulty in Difficulty}
+            for user_id, username, milliseconds, created_at, difficulty in query.yield_per(10000):
+                rows[difficulty].append((user_id, username, milliseconds, created_at))
+                if created_at and (self._watermark is None or created_at > self._watermark):
+                    self._watermark = created_at
+            for difficulty, difficulty_rows in rows.items():
+                self._indexes[difficulty].load(difficulty_rows)
+            self._refreshed_at = now
+            return
+
+        for user_id, username, milliseconds, created_at, difficulty in query.yield_per(10000):
+            self._indexes[difficulty].upsert(user_id, username, milliseconds, created_at)
+            if created_at and (self._watermark is None or created_at > self._watermark):
+                self._watermark = created_at
+
+        self._refreshed_at = now
+
+    def record(self, difficulty, user_id, username, milliseconds, created_at):
+        with self._lock:
+            self._indexes[difficulty].upsert(user_id, username, milliseconds, created_at)
+
+    def rank(self, difficulty, user_id):
+        with self._lock:
+            self._sync()
+            index = self._indexes[difficulty]
+            rank = index.rank(user_id)
+            total = len(index)
+        if rank is None:
+            return None
+        return {
+            'rank': rank,
+            'total': total,
+            'percentile': round((total - rank) / total * 100, 2)
+        }
+
+    def around(self, difficulty, user_id, radius):
+        with self._lock:
+            self._sync()
+            return self._indexes[difficulty].around(user_id, radius)
+
+    def page(self, difficulty, after, limit):
+        with self._lock:
+            self._sync()
+            return self._indexes[difficulty].page(after, limit)
+
+
+rank_engine = RankEngine()
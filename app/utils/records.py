@@ -0,0 +1,157 @@
+import datetime
+import zlib
+from sqlalchemy import case, insert, text
+from app import db
+from app.models import Leaderboard, Run, RunDailyStats
+from app.utils.broadcaster import leaderboard_broadcaster
+from app.utils.buffered_writer import BufferedWriter
+from app.utils.coins import credit
+from app.utils.period_boards import update_period_boards, period_board_cache
+from app.utils.quantiles import run_sketches
+from app.utils.rank_index import rank_engine
+from app.utils.records_cache import records_cache
+from app.utils.upsert import dialect_insert
+from app.utils.user_cache import user_cache
+
+
+TOP_SIZE = 10
+RECORD_REWARD = 15
+TOP_REWARD = 985
+
+
+class RunHistoryWriter(BufferedWriter):
+    # забеги и дневные агрегаты пишутся одной транзакцией, /stats читает только агрегаты
+    name = 'run-history'
+
+    def write(self, rows):
+        db.session.execute(insert(Run), rows)
+
+        rollups = {}
+        for row in rows:
+            key = (row['played_at'].date(), row['difficulty'])
+            rollup = rollups.get(key)
+            if rollup is None:
+                rollups[key] = [1, row['milliseconds'], row['milliseconds']]
+            else:
+                rollup[0] += 1
+                rollup[1] = min(rollup[1], row['milliseconds'])
+                rollup[2] += row['milliseconds']
+
+        # порядок ключей фиксирован, чтобы воркеры не ловили взаимоблокировки
+        table = RunDailyStats.__table__
+        stmt = dialect_insert(table).values([{
+            'day': day,
+            'difficulty': difficulty,
+            'runs': runs,
+            'best_milliseconds': best,
+            'total_milliseconds': total
+        } for (day, difficulty), (runs, best, total) in sorted(rollups.items(), key=lambda item: (item[0][0], item[0][1].value))])
+        stmt = stmt.on_conflict_do_update(
+            index_elements=['day', 'difficulty'],
+            set_={
+                'runs': table.c.runs + stmt.excluded.runs,
+                'total_milliseconds': table.c.total_milliseconds + stmt.excluded.total_milliseconds,
+                'best_milliseconds': case(
+                    (stmt.excluded.best_milliseconds < table.c.best_milliseconds, stmt.excluded.best_milliseconds),
+                    else_=table.c.best_milliseconds
+                )
+            }
+        )
+        db.session.execute(stmt)
+
+
+run_history = RunHistoryWriter()
+
+
+def _lock_difficulty(difficulty):
+    # сериализуем конкурентные отправки в одну сложность до конца транзакции
+    if db.engine.dialect.name == 'postgresql':
+        key = zlib.crc32(f'leaderboard:{difficulty.value}'.encode())
+        db.session.execute(text('SELECT pg_advisory_xact_lock(:key)'), {'key': key})
+
+
+def _upsert_best(user_id, username, milliseconds, difficulty, created_at):
+    stmt = dialect_insert(Leaderboard.__table__).values(
+        created_at=created_at,
+        milliseconds=milliseconds,
+        username=username,
+        user_id=user_id,
+        difficulty=difficulty
+    )
+    stmt = stmt.on_conflict_do_update(
+        index_elements=['user_id', 'difficulty'],
+        set_={'milliseconds': stmt.excluded.milliseconds, 'created_at': stmt.excluded.created_at},
+        where=Leaderboard.__table__.c.milliseconds > stmt.excluded.milliseconds
+    ).returning(Leaderboard.__table__.c.id)
+    return db.session.execute(stmt).first() is not None
+
+
+def _is_in_top(milliseconds, difficulty):
+    faster = db.session.query(Leaderboard.id).filter(
+        Leaderboard.difficulty == difficulty,
+        Leaderboard.milliseconds < milliseconds
+    ).limit(TOP_SIZE).count()
+    return faster < TOP_SIZE
+
+
+def submit_records(user, best_runs, runs=None):
+    # best_runs: {Difficulty: milliseconds}; всё применяется одной транзакцией
+    # runs: все забеги [(Difficulty, milliseconds, played_at)] для журнала, по умолчанию только лучшие
+    user_id, username = user.id, user.username
+    results = {}
+    created_at = datetime.datetime.now()
+    try:
+        difficulties = sorted(best_runs, key=lambda difficulty: difficulty.value)
+        for difficulty in difficulties:
+            _lock_difficulty(difficulty)
+
+        reward = 0
+        boards = []
+        for difficulty in difficulties:
+            milliseconds = best_runs[difficulty]
+            # в дневной/недельный/сезонный топ можно попасть и без нового личного рекорда
+            boards += update_period_boards(user_id, username, milliseconds, difficulty, created_at)
+            if not _upsert_best(user_id, username, milliseconds, difficulty, created_at):
+                results[difficulty] = (False, False)
+                continue
+
+            in_top = _is_in_top(milliseconds, difficulty)
+            reward += RECORD_REWARD + (TOP_REWARD if in_top else 0)
+            results[difficulty] = (True, in_top)
+
+        if reward:
+            credit(user_id, reward, 'record')
+        if reward or boards:
+            db.session.commit()
+        else:
+            db.session.rollback()
+    except Exception:
+        db.session.rollback()
+        raise
+
+    if runs is None:
+        runs = [(difficulty, milliseconds, None) for difficulty, milliseconds in best_runs.items()]
+    run_history.append([{
+        'user_id': user_id,
+        'difficulty': difficulty,
+        'milliseconds': milliseconds,
+        'played_at': played_at or created_at
+    } for difficulty, milliseconds, played_at in runs])
+    for difficulty, milliseconds, _ in runs:
+        run_sketches.add(difficulty, milliseconds)
+
+    for period, difficulty in boards:
+        period_board_cache.invalidate(period, difficulty)
+
+    if reward:
+        user_cache.invalidate(user_id)
+        records_cache.invalidate()
+        for difficulty, (improved, in_top) in results.items():
+            if improved:
+                rank_engine.record(difficulty, user_id, username, best_runs[difficulty], created_at)
+                leaderboard_broadcaster.publish(difficulty)
+    return results
+
+
+def submit_record(user, milliseconds, difficulty):
+    return submit_records(user, {difficulty: milliseconds})[difficulty]
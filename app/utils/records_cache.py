@@ -0,0 +1,45 @@
+import hashlib
+import threading
+import time
+
+
+class RecordsCache:
+    def __init__(self, ttl=5):
+        self.ttl = ttl
+        self.version = 0
+        self._body = None
+        self._etag = None
+        self._stored_at = 0
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+
+    def get(self):
+        with self._lock:
+            # другие воркеры не видят наши инвалидации, поэтому держим тело недолго
+            if self._body is not None and time.monotonic() - self._stored_at > self.ttl:
+                self._body = None
+                self._etag = None
+            if self._body is None:
+                self.misses += 1
+            else:
+                self.hits += 1
+            return self.version, self._body, self._etag
+
+    def store(self, version, body):
+        etag = hashlib.sha1(body).hexdigest()
+        with self._lock:
+            if version == self.version:
+                self._body = body
+                self._etag = etag
+                self._stored_at = time.monotonic()
+        return etag
+
+    def invalidate(self):
+        with self._lock:
+            self.version += 1
+            self._body = None
+            self._etag = None
+
+
+records_cache = RecordsCache()
@@ -0,0 +1,176 @@
+import math
+import threading
+import time
+from datetime import datetime, timezone
+from sqlalchemy import delete
+from app import db
+from app.models import RevokedToken
+from app.utils.upsert import dialect_insert
+
+
+class BloomFilter:
+    def __init__(self, capacity=100000, error_rate=0.001):
+        self.size = max(64, int(-capacity * math.log(error_rate) / math.log(2) ** 2))
+        self.hashes = max(1, round(self.size / capacity * math.log(2)))
+        self._bits = bytearray((self.size + 7) // 8)
+
+    def _probes(self, key):
+        # фильтр живёт в памяти одного процесса, поэтому встроенный hash() подходит
+        h = hash(key) & 0xFFFFFFFFFFFFFFFF
+        h1, h2 = h & 0xFFFFFFFF, (h >> 32) | 1
+        size = self.size
+        for i in range(self.hashes):
+            position = (h1 + i * h2) % size
+            yield position >> 3, 1 << (position & 7)
+
+    def add(self, key):
+        bits = self._bits
+        for index, mask in self._probes(key):
+            bits[index] |= mask
+
+    def __contains__(self, key):
+        bits = self._bits
+        h = hash(key) & 0xFFFFFFFFFFFFFFFF
+        h1 = h & 0xFFFFFFFF
+        size = self.size
+        # на промахе почти всегда выходим на первой пробе, без цикла
+        position = h1 % size
+        if not bits[position >> 3] & (1 << (position & 7)):
+            return False
+        h2 = (h >> 32) | 1
+        for i in range(1, self.hashes):
+            position = (h1 + i * h2) % size
+            if not bits[position >> 3] & (1 << (position & 7)):
+                return False
+        return True
+
+
+class RevocationList:
+    def __init__(self, rebuild_interval=60, capacity=100000):
+        self.rebuild_interval = rebuild_interval
+        self.capacity = capacity
+        self.probable_hits = 0
+        self._filter = BloomFilter(capacity)
+        self._revoked_users = {}  # user_id -> revoked_at (unix time); отзывов "всех токенов пользователя" мало
+        self._recent = []  # (monotonic, key, revoked_at) отзывов этого процесса, чтобы пересборка их не потеряла
+        self._app = None
+        self._thread = None
+        self._ready = threading.Event()
+        self._lock = threading.Lock()
+
+    def init_app(self, app):
+        self._app = app
+
+    def _start(self):
+        # поток запускается с первой проверкой, когда таблицы уже точно есть
+        with self._lock:
+            if self._thread is None and self._app is not None:
+                self._thread = threading.Thread(target=self._run, name='revocation-list', daemon=True)
+                self._thread.start()
+
+    def _run(self):
+        # другие воркеры узнают об отзыве не позднее чем через rebuild_interval
+        while True:
+            if self._ready.is_set():
+                time.sleep(self.rebuild_interval)
+            with self._app.app_context():
+                try:
+                    self.rebuild()
+                except Exception as e:
+                    db.session.rollback()
+                    print(f"Error rebuilding revocation list: {e}")
+                finally:
+                    self._ready.set()
+
+    def rebuild(self):
+        # вызывается из фонового потока со своим контекстом приложения, запросы БД не ждут
+        started = time.monotonic()
+        now = datetime.now(timezone.utc)
+        db.session.execute(delete(RevokedToken).where(RevokedToken.expires_at < now))
+        db.session.commit()
+        rows = db.session.execute(db.select(RevokedToken.key, RevokedToken.revoked_at)).all()
+        db.session.commit()
+
+        bloom = BloomFilter(max(self.capacity, len(rows) * 2))
+        revoked_users = {}
+        for key, revoked_at in rows:
+            if revoked_at.tzinfo is None:
+                revoked_at = revoked_at.replace(tzinfo=timezone.utc)
+            self._apply(bloom, revoked_users, key, revoked_at.timestamp())
+
+        with self._lock:
+            # отзывы, сделанные во время пересборки, могли не попасть в выборку
+            for _, key, revoked_at in self._recent:
+                self._apply(bloom, revoked_users, key, revoked_at)
+            self._recent = [entry for entry in self._recent if entry[0] >= started]
+            self._filter = bloom
+            self._revoked_users = revoked_users
+        self._ready.set()
+
+    @staticmethod
+    def _apply(bloom, revoked_users, key, revoked_at):
+        if key.startswith('user:'):
+            user_id = int(key[5:])
+            revoked_users[user_id] = max(revoked_at, revoked_users.get(user_id, 0))
+        else:
+            bloom.add(key)
+
+    def _remember(self, key, revoked_at):
+        with self._lock:
+            self._recent.append((time.monotonic(), key, revoked_at.timestamp()))
+            self._apply(self._filter, self._revoked_users, key, revoked_at.timestamp())
+
+    def is_revoked(self, claims):
+        if self._thread is None:
+            self._start()
+        if not self._ready.is_set():
+            # сразу после старта ждём первую сборку, а не пропускаем отозванные токены
+            self._ready.wait(1)
+        revoked_at = self._revoked_users.get(claims['id'])
+        if revoked_at is not None and claims.get('iat', 0) < revoked_at:
+            return True
+        jti = claims.get('jti')
+        if jti is None or jti not in self._filter:
+            return False
+
+        self.probable_hits += 1
+        return db.session.get(RevokedToken, jti) is not None
+
+    def _store(self, key, now, expires_at):
+        record = db.session.get(RevokedToken, key)
+        if record is None:
+            db.session.add(RevokedToken(key=key, revoked_at=now, expires_at=expires_at))
+        else:
+            record.revoked_at = now
+            record.expires_at = expires_at
+
+    def revoke(self, claims):
+        if claims.get('jti'):
+            now = datetime.now(timezone.utc)
+            self._store(claims['jti'], now, datetime.fromtimestamp(claims['exp'], timezone.utc))
+            self._remember(claims['jti'], now)
+
+    def claim(self, claims):
+        # одноразовый токен: атомарно помечаем использованным; False, если его уже предъявили
+        if not claims.get('jti'):
+            return False
+        now = datetime.now(timezone.utc)
+        table = RevokedToken.__table__
+        stmt = dialect_insert(table).values(
+            key=claims['jti'],
+            revoked_at=now,
+            expires_at=datetime.fromtimestamp(claims['exp'], timezone.utc)
+        ).on_conflict_do_nothing(index_elements=['key']).returning(table.c.key)
+        if db.session.execute(stmt).first() is None:
+            return False
+        self._remember(claims['jti'], now)
+        return True
+
+    def revoke_user(self, user_id, lifetime):
+        # все токены, выданные до этого момента, перестают действовать
+        now = datetime.now(timezone.utc)
+        self._store(f'user:{user_id}', now, now + lifetime)
+        self._remember(f'user:{user_id}', now)
+
+
+revocation_list = RevocationList()
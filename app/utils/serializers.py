@@ -0,0 +1,65 @@
+import enum
+import json
+from datetime import date
+from flask import current_app
+from werkzeug.http import http_date
+from sqlalchemy import select
+from app.models import User, Leaderboard
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+
+def _default(value):
+    if isinstance(value, date):
+        return value.isoformat()
+    if isinstance(value, enum.Enum):
+        return value.value
+    raise TypeError(f'Object of type {type(value).__name__} is not JSON serializable')
+
+
+def dumps(obj):
+    if orjson is not None:
+        return orjson.dumps(obj)
+    return json.dumps(obj, default=_default, separators=(',', ':'), ensure_ascii=False).encode('utf-8')
+
+
+def json_response(obj, status=200):
+    return current_app.response_class(dumps(obj), status=status, mimetype='application/json')
+
+
+class Schema:
+    def __init__(self, model, views, formats=None):
+        self.model = model
+        self.views = {name: tuple(fields) for name, fields in views.items()}
+        self.formats = formats or {}
+        self._columns = {name: [getattr(model, field) for field in fields] for name, fields in self.views.items()}
+
+    def select(self, view):
+        return select(*self._columns[view])
+
+    def rows(self, result, view):
+        # строки результата сразу в dict, без гидратации ORM-объектов
+        fields = self.views[view]
+        rows = [dict(zip(fields, row)) for row in result]
+        for field, format_value in self.formats.items():
+            if field in fields:
+                for row in rows:
+                    if row[field] is not None:
+                        row[field] = format_value(row[field])
+        return rows
+
+
+leaderboard_schema = Schema(Leaderboard, {
+    'public': ('id', 'created_at', 'milliseconds', 'username', 'user_id', 'difficulty'),
+    'personal': ('milliseconds', 'difficulty')
+})
+
+user_schema = Schema(User, {
+    'admin': ('id', 'username', 'role', 'coins', 'email', 'is_verified', 'enabled_2fa', 'attempts', 'ban_until')
+}, formats={
+    # админка разбирает ban_until в том виде, в каком его отдавал jsonify (RFC 822)
+    'ban_until': http_date
+})
@@ -0,0 +1,106 @@
+import math
+import threading
+import time
+from collections import OrderedDict
+
+
+class _Window:
+    __slots__ = ('index', 'previous', 'current')
+
+    def __init__(self, index):
+        self.index = index
+        self.previous = 0
+        self.current = 0
+
+
+class _Shard:
+    __slots__ = ('lock', 'windows')
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.windows = OrderedDict()
+
+
+class SlidingWindowLimiter:
+    def __init__(self, limit, window, shards=16, max_keys=100000):
+        self.limit = limit
+        self.window = window
+        self.max_keys_per_shard = max(1, max_keys // shards)
+        self._shards = [_Shard() for _ in range(shards)]
+
+    def _shard(self, key):
+        return self._shards[hash(key) % len(self._shards)]
+
+    def _roll(self, entry, index):
+        if index != entry.index:
+            entry.previous = entry.current if index == entry.index + 1 else 0
+            entry.current = 0
+            entry.index = index
+
+    def _estimate(self, entry, now):
+        # скользящее окно аппроксимируем двумя фиксированными с весом предыдущего
+        elapsed = now / self.window - entry.index
+        return entry.previous * (1 - elapsed) + entry.current
+
+    def count(self, key):
+        now = time.time()
+        index = int(now // self.window)
+        shard = self._shard(key)
+        with shard.lock:
+            entry = shard.windows.get(key)
+            if entry is None:
+                return 0
+            self._roll(entry, index)
+            return self._estimate(entry, now)
+
+    def hit(self, key):
+        now = time.time()
+        index = int(now // self.window)
+        shard = self._shard(key)
+        with shard.lock:
+            entry = shard.windows.get(key)
+            if entry is None:
+                entry = shard.windows[key] = _Window(index)
+                if len(shard.windows) > self.max_keys_per_shard:
+                    shard.windows.popitem(last=False)
+            else:
+                shard.windows.move_to_end(key)
+                self._roll(entry, index)
+            entry.current += 1
+            return self._estimate(entry, now)
+
+    def reset(self, key):
+        shard = self._shard(key)
+        with shard.lock:
+            shard.windows.pop(key, None)
+
+    def retry_after(self):
+        return math.ceil(self.window - time.time() % self.window)
+
+    def __len__(self):
+        return sum(len(shard.windows) for shard in self._shards)
+
+
+class LoginThrottle:
+    def __init__(self, ip_limit=20, username_limit=5, window=300):
+        self.by_ip = SlidingWindowLimiter(ip_limit, window)
+        self.by_username = SlidingWindowLimiter(username_limit, window)
+
+    def retry_after(self, ip, username):
+        if self.by_ip.count(ip) >= self.by_ip.limit:
+            return self.by_ip.retry_after()
+        if self.by_username.count(username) >= self.by_username.limit:
+            return self.by_username.retry_after()
+        return None
+
+    def fail(self, ip, username):
+        self.by_ip.hit(ip)
+        count = self.by_username.hit(username)
+        # True только при пересечении порога, чтобы бан писался в БД один раз
+        return count - 1 < self.by_username.limit <= count
+
+    def succeed(self, username):
+        self.by_username.reset(username)
+
+
+login_throttle = LoginThrottle()
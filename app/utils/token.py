@@ -1,22 +1,40 @@
-import datetime
+import time
+import uuid
 import jwt
 from flask import current_app
+from app.utils.revocation import revocation_list
 
 
-def generate_token(user):
+def _encode(user, token_type, lifetime):
+    now = time.time()
     payload = {
         'id': user.id,
         'username': user.username,
         'role': user.role,
-        'exp': datetime.datetime.now() + datetime.timedelta(minutes=60)
+        'type': token_type,
+        'jti': uuid.uuid4().hex,
+        'iat': now,
+        'exp': int(now + lifetime.total_seconds())
     }
-    token = jwt.encode(payload, current_app.config['SECRET_KEY'], algorithm='HS256')
-    return token
+    return jwt.encode(payload, current_app.config['SECRET_KEY'], algorithm='HS256')
+
+
+def generate_token(user):
+    return _encode(user, 'access', current_app.config['ACCESS_TOKEN_LIFETIME'])
+
 
+def generate_refresh_token(user):
+    return _encode(user, 'refresh', current_app.config['REFRESH_TOKEN_LIFETIME'])
 
-def verify_token(token):
+
+def verify_token(token, token_type='access'):
     try:
         payload = jwt.decode(token, current_app.config['SECRET_KEY'], algorithms=['HS256'])
+        # токены, выданные до появления refresh, типа не содержат и считаются access
+        if payload.get('type', 'access') != token_type:
+            return 'Invalid token'
+        if revocation_list.is_revoked(payload):
+            return 'Token has been revoked'
         return payload
     except jwt.ExpiredSignatureError:
         return 'Token has expired'
@@ -24,4 +42,8 @@ def verify_token(token):
         return 'Invalid token'
     except Exception as e:
         print(f"Error decoding token: {e}")
-        return 'Invalid token' 
\ No newline at end of file
+        return 'Invalid token'
+
+
+def revoke_user_tokens(user_id):
+    revocation_list.revoke_user(user_id, current_app.config['REFRESH_TOKEN_LIFETIME'])
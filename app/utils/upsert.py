@@ -0,0 +1,10 @@
+from app import db
+
+
+def dialect_insert(table):
+    # ON CONFLICT есть только в insert() конкретного диалекта; грузим только нужный
+    if db.engine.dialect.name == 'sqlite':
+        from sqlalchemy.dialects.sqlite import insert
+    else:
+        from sqlalchemy.dialects.postgresql import insert
+    return insert(table)
@@ -0,0 +1,69 @@
+import threading
+import time
+from collections import OrderedDict
+from sqlalchemy import inspect
+
+
+class CachedUser:
+    __slots__ = ('id', 'username', 'role', 'coins', 'email', 'is_verified', 'enabled_2fa')
+
+    def __init__(self, user):
+        for field in self.__slots__:
+            setattr(self, field, getattr(user, field))
+
+    def __repr__(self):
+        return f"CachedUser('{self.username}', '{self.role}')"
+
+
+class UserCache:
+    def __init__(self, maxsize=10000, ttl=10):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self._entries = OrderedDict()  # user_id -> (expires_at, CachedUser)
+        self._lock = threading.Lock()
+
+    def get(self, user_id):
+        with self._lock:
+            entry = self._entries.get(user_id)
+            if entry is None or entry[0] < time.monotonic():
+                self.misses += 1
+                return None
+            self._entries.move_to_end(user_id)
+            self.hits += 1
+            return entry[1]
+
+    def put(self, user):
+        cached = CachedUser(user)
+        with self._lock:
+            self._entries[cached.id] = (time.monotonic() + self.ttl, cached)
+            self._entries.move_to_end(cached.id)
+            while len(self._entries) > self.maxsize:
+                self._entries.popitem(last=False)
+                self.evictions += 1
+        return cached
+
+    def invalidate(self, user_id):
+        with self._lock:
+            self._entries.pop(user_id, None)
+
+    def invalidate_user(self, user):
+        # id берём из identity, чтобы не перезагружать истёкший после commit объект
+        self.invalidate(inspect(user).identity[0])
+
+    def stats(self):
+        with self._lock:
+            total = self.hits + self.misses
+            return {
+                'size': len(self._entries),
+                'maxsize': self.maxsize,
+                'hits': self.hits,
+                'misses': self.misses,
+                'evictions': self.evictions,
+                'hit_rate': round(self.hits / total, 4) if total else 0.0
+            }
+
+
+user_cache = UserCache()
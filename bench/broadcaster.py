@@ -0,0 +1,100 @@
+import argparse
+import datetime
+import json
+import os
+import queue
+import statistics
+import sys
+import tempfile
+import threading
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description='LeaderboardBroadcaster fan-out latency and drop rate')
+    parser.add_argument('--subscribers', type=int, default=1000)
+    parser.add_argument('--events', type=int, default=200)
+    parser.add_argument('--rate', type=float, default=50, help='leaderboard changes per second')
+    parser.add_argument('--slow', type=float, default=0.05, help='share of subscribers that read slower than --rate')
+    parser.add_argument('--slow-delay-ms', type=float, default=100)
+    parser.add_argument('--buffer', type=int, default=32)
+    return parser.parse_args()
+
+
+def main():
+    args = parse_args()
+    db_path = os.path.join(tempfile.mkdtemp(prefix='saper-bench-'), 'broadcaster.db')
+    os.environ['database_url'] = f'sqlite:///{db_path}'
+
+    from app import create_app, db
+    from app.models import Difficulty
+    from app.utils.broadcaster import LeaderboardBroadcaster
+    from app.utils.rank_index import rank_engine
+
+    app = create_app()
+    # отдельный экземпляр без init_app: без фонового опроса, события идут только от publish
+    broadcaster = LeaderboardBroadcaster(buffer_size=args.buffer)
+    difficulty = Difficulty.hard
+    sent = {}  # milliseconds -> perf_counter в момент publish
+    latencies = []
+    done = threading.Event()
+
+    def consume(subscriber, delay):
+        while True:
+            try:
+                event = subscriber.queue.get(timeout=0.5)
+            except queue.Empty:
+                if done.is_set() or subscriber.dropped:
+                    return
+                continue
+            received = time.perf_counter()
+            milliseconds = json.loads(event.split('data: ', 1)[1])['changed'][0]['milliseconds']
+            latencies.append(received - sent[milliseconds])
+            if delay:
+                time.sleep(delay)
+
+    with app.app_context():
+        db.create_all()
+        broadcaster.snapshot()
+
+        slow = int(args.subscribers * args.slow)
+        consumers = []
+        for i in range(args.subscribers):
+            delay = args.slow_delay_ms / 1000 if i < slow else 0
+            consumers.append(threading.Thread(target=consume, args=(broadcaster.subscribe(), delay), daemon=True))
+        for consumer in consumers:
+            consumer.start()
+
+        # каждое событие улучшает время одного из топ-игроков, так что publish всегда что-то рассылает
+        publish = []
+        now = datetime.datetime.now()
+        started = time.perf_counter()
+        for i in range(args.events):
+            milliseconds = args.events - i
+            rank_engine.record(difficulty, i % 11 + 1, f'player{i % 11}', milliseconds, now)
+            sent[milliseconds] = time.perf_counter()
+            broadcaster.publish(difficulty)
+            publish.append(time.perf_counter() - sent[milliseconds])
+            time.sleep(max(0, started + (i + 1) / args.rate - time.perf_counter()))
+
+        done.set()
+        for consumer in consumers:
+            consumer.join()
+
+    os.remove(db_path)
+
+    fan_out = statistics.quantiles(latencies, n=100, method='inclusive')
+    publish = statistics.quantiles(publish, n=100, method='inclusive')
+    expected = args.subscribers * args.events
+    print(f'{args.subscribers} subscribers ({slow} slow), {args.events} events at {args.rate:.0f}/s, buffer {args.buffer}')
+    print(f'publish            p50 {publish[49] * 1e3:8.2f} ms  p99 {publish[98] * 1e3:8.2f} ms')
+    print(f'fan-out latency    p50 {fan_out[49] * 1e3:8.2f} ms  p99 {fan_out[98] * 1e3:8.2f} ms')
+    print(f'dropped            {broadcaster.dropped} subscribers ({broadcaster.dropped / args.subscribers * 100:.1f}%)')
+    print(f'delivered          {len(latencies)} of {expected} events ({len(latencies) / expected * 100:.1f}%)')
+
+
+if __name__ == '__main__':
+    main()
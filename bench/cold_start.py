@@ -0,0 +1,102 @@
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+from collections import defaultdict
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+# выполняется в свежем интерпретаторе: импорт, create_app и первый запрос
+PROBE = '''
+import json, time
+started = time.perf_counter()
+from app import create_app, db
+imported = time.perf_counter()
+app = create_app()
+created = time.perf_counter()
+with app.app_context():
+    db.create_all()
+client = app.test_client()
+ready = time.perf_counter()
+client.get('/get_backgrounds')
+served = time.perf_counter()
+print(json.dumps({
+    'import_ms': (imported - started) * 1000,
+    'create_app_ms': (created - imported) * 1000,
+    'first_request_ms': (served - ready) * 1000,
+    'total_ms': (imported - started + created - imported + served - ready) * 1000
+}))
+'''
+
+
+def parse_args():
+    from config import COLD_START_BUDGET_MS
+    parser = argparse.ArgumentParser(description='Cold start of create_app: import time per module and time to first request')
+    parser.add_argument('--repeat', type=int, default=5)
+    parser.add_argument('--budget-ms', type=float, default=COLD_START_BUDGET_MS,
+                        help='exit with status 1 if the median total exceeds this budget')
+    parser.add_argument('--profile', action='store_true', help='print import time per module (python -X importtime)')
+    parser.add_argument('--top', type=int, default=20)
+    return parser.parse_args()
+
+
+def parse_importtime(stderr):
+    # строки вида "import time:  self [us] | cumulative | name", вложенность задана отступом
+    modules = []
+    for line in stderr.splitlines():
+        if not line.startswith('import time:') or 'self [us]' in line:
+            continue
+        self_us, cumulative_us, name = line[len('import time:'):].split('|')
+        modules.append((name.strip(), int(self_us), int(cumulative_us), len(name) - len(name.lstrip())))
+    return modules
+
+
+def run_probe(database_url, profile):
+    env = dict(os.environ, database_url=database_url)
+    command = [sys.executable] + (['-X', 'importtime'] if profile else []) + ['-c', PROBE]
+    result = subprocess.run(command, cwd=ROOT, env=env, capture_output=True, text=True, check=True)
+    return json.loads(result.stdout.strip().splitlines()[-1]), result.stderr
+
+
+def print_profile(modules, top):
+    packages = defaultdict(int)
+    for name, self_us, _, _ in modules:
+        packages[name.split('.')[0]] += self_us
+    print(f'\n{"package":40} {"self ms":>10}')
+    for name, self_us in sorted(packages.items(), key=lambda item: -item[1])[:top]:
+        print(f'{name:40} {self_us / 1000:10.1f}')
+
+    print(f'\n{"app module":40} {"cumulative ms":>14}')
+    app_modules = [(name, cumulative_us) for name, _, cumulative_us, _ in modules if name == 'app' or name.startswith('app.')]
+    for name, cumulative_us in sorted(app_modules, key=lambda item: -item[1])[:top]:
+        print(f'{name:40} {cumulative_us / 1000:14.1f}')
+
+
+def main():
+    args = parse_args()
+    with tempfile.TemporaryDirectory() as directory:
+        database_url = f'sqlite:///{os.path.join(directory, "cold_start.db")}'
+        runs = [run_probe(database_url, False)[0] for _ in range(args.repeat)]
+        # -X importtime сам замедляет импорт, поэтому профиль снимаем отдельным прогоном
+        stderr = run_probe(database_url, True)[1] if args.profile else ''
+
+    for key in ('import_ms', 'create_app_ms', 'first_request_ms', 'total_ms'):
+        values = [run[key] for run in runs]
+        print(f'{key:18} median {statistics.median(values):8.1f}  min {min(values):8.1f}  max {max(values):8.1f}')
+
+    if args.profile:
+        print_profile(parse_importtime(stderr), args.top)
+
+    total = statistics.median(run['total_ms'] for run in runs)
+    if total > args.budget_ms:
+        print(f'\ncold start {total:.1f} ms is over the budget of {args.budget_ms:.0f} ms')
+        sys.exit(1)
+    print(f'\ncold start {total:.1f} ms is within the budget of {args.budget_ms:.0f} ms')
+
+
+if __name__ == '__main__':
+    main()
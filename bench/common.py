@@ -0,0 +1,27 @@
+import os
+import sys
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def add_database_args(parser, name):
+    parser.add_argument('--database-url', default=f'sqlite:///{os.path.join(ROOT, "bench", f"{name}.db")}')
+    parser.add_argument('--force-drop', action='store_true', help='allow dropping all tables of a non-SQLite database')
+
+
+def use_database(args, drop=True):
+    # бенчмарки пересоздают схему: чужую базу по ошибочному database_url не трогаем
+    if drop and not args.database_url.startswith('sqlite') and not args.force_drop:
+        sys.exit(f'Refusing to drop all tables in {args.database_url.split("@")[-1]}: not SQLite, pass --force-drop to confirm')
+    # config.py читает окружение при импорте, поэтому вызывается до импорта приложения
+    os.environ['database_url'] = args.database_url
+
+
+def reset_database(db):
+    db.drop_all()
+    db.create_all()
+
+
+def remove_database(database_url):
+    if database_url.startswith('sqlite:///') and os.path.exists(database_url[len('sqlite:///'):]):
+        os.remove(database_url[len('sqlite:///'):])
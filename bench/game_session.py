@@ -0,0 +1,77 @@
+import argparse
+import os
+import random
+import statistics
+import sys
+import time
+import tracemalloc
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description='GameSession boards/sec and reveal latency')
+    parser.add_argument('--difficulty', default='hard', choices=('easy', 'medium', 'hard'))
+    parser.add_argument('--boards', type=int, default=2000)
+    parser.add_argument('--games', type=int, default=200, help='games played to the end for reveal latency')
+    parser.add_argument('--seed', type=int, default=42)
+    return parser.parse_args()
+
+
+def main():
+    args = parse_args()
+    from app.models import Difficulty
+    from app.utils.game_session import GameSession, SessionStore
+
+    difficulty = Difficulty(args.difficulty)
+    rng = random.Random(args.seed)
+    probe = GameSession(0, difficulty)
+    rows, cols = probe.rows, probe.cols
+    probe.reveal(0, 0)  # первый вызов подгружает numpy
+
+    # новая доска: создание сессии и первый ход, на котором расставляются мины
+    started = time.perf_counter()
+    for i in range(args.boards):
+        GameSession(1, difficulty, seed=i).reveal(rng.randrange(rows), rng.randrange(cols))
+    boards_per_second = args.boards / (time.perf_counter() - started)
+
+    # партии до конца: открываем все безопасные клетки в случайном порядке
+    first, latencies, cells = [], [], 0
+    for i in range(args.games):
+        session = GameSession(1, difficulty, seed=args.boards + i)
+        started = time.perf_counter()
+        opened = session.reveal(rng.randrange(rows), rng.randrange(cols))
+        first.append(time.perf_counter() - started)
+        cells += len(opened)
+        mines = {tuple(cell) for cell in session.mine_cells()}
+        safe = [(r, c) for r in range(rows) for c in range(cols) if (r, c) not in mines]
+        rng.shuffle(safe)
+        for row, col in safe:
+            started = time.perf_counter()
+            opened = session.reveal(row, col)
+            elapsed = time.perf_counter() - started
+            if opened:
+                latencies.append(elapsed)
+                cells += len(opened)
+        assert session.status == 'won'
+
+    tracemalloc.start()
+    store = SessionStore()
+    before = tracemalloc.get_traced_memory()[0]
+    for i in range(1000):
+        store.create(i, difficulty).reveal(rng.randrange(rows), rng.randrange(cols))
+    per_session = (tracemalloc.get_traced_memory()[0] - before) / 1000
+    tracemalloc.stop()
+
+    reveal = statistics.quantiles(latencies, n=100, method='inclusive')
+    print(f'{args.difficulty} {rows}x{cols}, {probe.mine_count} mines')
+    print(f'new boards         {boards_per_second:10.0f} boards/s')
+    print(f'first reveal       p50 {statistics.median(first) * 1e6:8.1f} us')
+    print(f'reveal             p50 {reveal[49] * 1e6:8.1f} us  p99 {reveal[98] * 1e6:8.1f} us  '
+          f'({len(latencies)} moves, {cells / len(latencies + first):.1f} cells/move)')
+    print(f'session footprint  {per_session:10.0f} bytes')
+
+
+if __name__ == '__main__':
+    main()
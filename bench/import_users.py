@@ -0,0 +1,56 @@
+import argparse
+import csv
+import os
+import sys
+import tempfile
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from bench.common import add_database_args, use_database, reset_database, remove_database
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description='Users/sec of the import-users command on a generated CSV file')
+    add_database_args(parser, 'import_users')
+    parser.add_argument('--users', type=int, default=100000)
+    parser.add_argument('--rounds', type=int, default=4, help='bcrypt rounds; at 12 hashing dominates, about 0.25 s per user per core')
+    parser.add_argument('--workers', type=int, default=os.cpu_count())
+    return parser.parse_args()
+
+
+def main():
+    args = parse_args()
+    use_database(args)
+
+    from app import create_app, db
+
+    app = create_app()
+    with app.app_context():
+        reset_database(db)
+
+    with tempfile.TemporaryDirectory() as directory:
+        path = os.path.join(directory, 'users.csv')
+        with open(path, 'w', newline='', encoding='utf-8') as f:
+            writer = csv.writer(f)
+            writer.writerow(['username', 'email', 'password'])
+            for i in range(args.users):
+                writer.writerow([f'player{i}', f'player{i}@bench.local', f'password{i}'])
+
+        started = time.perf_counter()
+        result = app.test_cli_runner().invoke(args=[
+            'import-users', path, '--rounds', str(args.rounds), '--workers', str(args.workers)
+        ])
+        elapsed = time.perf_counter() - started
+        if result.exception:
+            raise result.exception
+
+    print(result.output.strip().splitlines()[-1])
+    print(f'{args.users} users, {args.workers} workers, {args.rounds} rounds: {args.users / elapsed:.0f} users/s')
+
+    remove_database(args.database_url)
+
+
+if __name__ == '__main__':
+    main()
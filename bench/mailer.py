@@ -0,0 +1,94 @@
+import argparse
+import os
+import socketserver
+import sys
+import threading
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+
+class SmtpStandIn(socketserver.StreamRequestHandler):
+    # минимальный SMTP-сервер: принимает всё, письма только считает; latency — задержка ответа на DATA
+    latency = 0.0
+    received = 0
+    lock = threading.Lock()
+
+    def reply(self, line):
+        self.wfile.write(line.encode() + b'\r\n')
+
+    def handle(self):
+        self.reply('220 bench ESMTP')
+        while True:
+            line = self.rfile.readline()
+            if not line:
+                return
+            command = line.decode(errors='replace').strip().upper()
+            if command.startswith('EHLO'):
+                self.wfile.write(b'250-bench\r\n250 AUTH PLAIN LOGIN\r\n')
+            elif command.startswith('AUTH'):
+                self.reply('235 ok')
+            elif command == 'DATA':
+                self.reply('354 go ahead')
+                while self.rfile.readline() not in (b'.\r\n', b''):
+                    pass
+                time.sleep(self.latency)
+                with SmtpStandIn.lock:
+                    SmtpStandIn.received += 1
+                self.reply('250 queued')
+            elif command == 'QUIT':
+                self.reply('221 bye')
+                return
+            else:
+                self.reply('250 ok')
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description='Verification mails/sec through Mailer against a local SMTP stand-in')
+    parser.add_argument('--mails', type=int, default=2000)
+    parser.add_argument('--workers', default='1,2,4,8')
+    parser.add_argument('--latency-ms', type=float, default=5, help='stand-in delay per message, like a remote server')
+    return parser.parse_args()
+
+
+def main():
+    args = parse_args()
+    server = socketserver.ThreadingTCPServer(('127.0.0.1', 0), SmtpStandIn)
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    SmtpStandIn.latency = args.latency_ms / 1000
+
+    os.environ.update(smtp_host='127.0.0.1', smtp_port=str(server.server_address[1]), smtp_ssl='false',
+                      sender_mail='bench@bench.local', sender_password='bench')
+    from app.utils import email
+    from app.utils.email import Mailer, send_verification
+
+    # прежний путь: новое соединение и логин на каждое письмо прямо в запросе
+    count = min(args.mails, 200)
+    started = time.perf_counter()
+    for i in range(count):
+        mailer = Mailer(workers=0)
+        server_connection = mailer._connect()
+        server_connection.sendmail(email.SENDER_MAIL, f'player{i}@bench.local', 'Subject: code\r\n\r\n123456')
+        mailer._close(server_connection)
+    elapsed = time.perf_counter() - started
+    print(f'{"inline, connect per mail":28} {count / elapsed:8.0f} mails/s  request blocked {elapsed / count * 1000:7.2f} ms/mail')
+
+    for workers in map(int, args.workers.split(',')):
+        email.mailer = Mailer(workers=workers, maxsize=args.mails)
+        SmtpStandIn.received = 0
+        started = time.perf_counter()
+        for i in range(args.mails):
+            send_verification(f'player{i}@bench.local', '123456', block=True)
+        enqueued = time.perf_counter() - started
+        email.mailer.join()
+        elapsed = time.perf_counter() - started
+        print(f'{f"Mailer, {workers} workers":28} {args.mails / elapsed:8.0f} mails/s  request blocked {enqueued / args.mails * 1000:7.3f} ms/mail  '
+              f'delivered {SmtpStandIn.received}/{args.mails}, dead letters {len(email.mailer.dead_letters)}')
+
+    server.shutdown()
+
+
+if __name__ == '__main__':
+    main()
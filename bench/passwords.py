@@ -0,0 +1,58 @@
+import argparse
+import json
+import os
+import subprocess
+import sys
+import tempfile
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description='bcrypt hashes/sec and p99 login latency for each cost setting')
+    parser.add_argument('--rounds', default='4,8,10,12')
+    parser.add_argument('--hashes', type=int, default=20, help='hashes per thread count and cost setting')
+    parser.add_argument('--workers', type=int, default=os.cpu_count())
+    parser.add_argument('--logins', type=int, default=50, help='login requests per cost setting, see bench/run.py')
+    parser.add_argument('--clients', type=int, default=4)
+    return parser.parse_args()
+
+
+def hashes_per_second(rounds, hashes, workers):
+    from app.utils.passwords import hash_password
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+        started = time.perf_counter()
+        list(pool.map(hash_password, ['bench-password'] * hashes, [rounds] * hashes))
+        return hashes / (time.perf_counter() - started)
+
+
+def login_latency(rounds, logins, clients):
+    # сценарий login из bench/run.py: пароль засеян с тем же числом раундов, что и в конфиге
+    with tempfile.TemporaryDirectory() as directory:
+        output = os.path.join(directory, 'result.json')
+        subprocess.run([
+            sys.executable, os.path.join(ROOT, 'bench', 'run.py'),
+            '--database-url', f'sqlite:///{os.path.join(directory, "passwords.db")}',
+            '--users', '100', '--records', '0', '--scenarios', 'login',
+            '--requests', str(logins), '--clients', str(clients),
+            '--bcrypt-rounds', str(rounds), '--output', output
+        ], cwd=ROOT, check=True, capture_output=True)
+        with open(output) as f:
+            return json.load(f)['results']['login']
+
+
+def main():
+    args = parse_args()
+    print(f'{"rounds":>6} {"hashes/s, 1 thread":>20} {f"hashes/s, {args.workers} threads":>22} {"login p50 ms":>13} {"login p99 ms":>13} {"login req/s":>12}')
+    for rounds in map(int, args.rounds.split(',')):
+        single = hashes_per_second(rounds, args.hashes, 1)
+        parallel = hashes_per_second(rounds, args.hashes, args.workers)
+        login = login_latency(rounds, args.logins, args.clients)
+        print(f'{rounds:6} {single:20.1f} {parallel:22.1f} {login["p50_ms"]:13.1f} {login["p99_ms"]:13.1f} {login["throughput_rps"]:12.1f}')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,49 @@
+import argparse
+import os
+import statistics
+import sys
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description='render_qr time and size for png/svg at several scales')
+    parser.add_argument('--scales', default='2,4,8,16')
+    parser.add_argument('--renders', type=int, default=200)
+    return parser.parse_args()
+
+
+def main():
+    args = parse_args()
+    from app.utils.qr import QR_FORMATS, QrCache, render_qr
+    from app.utils.auth import generate_secret
+
+    scales = [int(s) for s in args.scales.split(',')]
+    secret = generate_secret()
+    uri = f'otpauth://totp/Saper2fa:player@bench.local?secret={secret}&issuer=Saper2fa'
+    render_qr(uri)  # первый вызов подгружает pyqrcode/pypng
+
+    print(f'{"format":6} {"scale":>5} {"p50 ms":>8} {"p99 ms":>8} {"bytes":>8}')
+    for fmt in QR_FORMATS:
+        for scale in scales:
+            latencies = []
+            for _ in range(args.renders):
+                started = time.perf_counter()
+                image = render_qr(uri, fmt, scale)
+                latencies.append(time.perf_counter() - started)
+            quantiles = statistics.quantiles(latencies, n=100, method='inclusive')
+            print(f'{fmt:6} {scale:5d} {quantiles[49] * 1e3:8.2f} {quantiles[98] * 1e3:8.2f} {len(image):8d}')
+
+    # повторный запрос того же секрета во время настройки 2FA
+    cache = QrCache()
+    cache.put(secret, 'png', 8, render_qr(uri, 'png', 8))
+    started = time.perf_counter()
+    for _ in range(args.renders):
+        cache.get(secret, 'png', 8)
+    print(f'cache hit {(time.perf_counter() - started) / args.renders * 1e6:.2f} us')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,59 @@
+import argparse
+import bisect
+import os
+import random
+import sys
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description='KLL sketch accuracy and update throughput against exact quantiles')
+    parser.add_argument('--runs', type=int, default=1000000)
+    parser.add_argument('--workers', type=int, default=4)
+    parser.add_argument('--k', type=int, default=200)
+    return parser.parse_args()
+
+
+def main():
+    args = parse_args()
+    from app.utils.quantiles import KllSketch, SketchView
+
+    # времена прохождения похожи на логнормальные: медиана около минуты, длинный хвост
+    values = [int(random.lognormvariate(11, 0.6)) for _ in range(args.runs)]
+
+    sketch = KllSketch(args.k)
+    started = time.perf_counter()
+    for value in values:
+        sketch.update(value)
+    update_elapsed = time.perf_counter() - started
+
+    # то же самое, но раздельно по «воркерам» и со слиянием, как при чекпоинтах
+    parts = [KllSketch(args.k) for _ in range(args.workers)]
+    for index, value in enumerate(values):
+        parts[index % args.workers].update(value)
+    merged = KllSketch(args.k)
+    for part in parts:
+        merged.merge(part)
+
+    started = time.perf_counter()
+    exact = sorted(values)
+    exact_elapsed = time.perf_counter() - started
+
+    print(f'runs: {args.runs}, k: {args.k}')
+    print(f'sketch update:  {args.runs / update_elapsed:12.0f} runs/s, {sum(len(level) for level in sketch.compactors)} items kept')
+    print(f'exact sort:     {exact_elapsed * 1000:12.1f} ms')
+    for name, candidate in (('single', sketch), (f'merged x{args.workers}', merged)):
+        view = SketchView([candidate])
+        quantiles = (0.01, 0.1, 0.25, 0.5, 0.75, 0.9, 0.99)
+        started = time.perf_counter()
+        estimates = [view.quantile(q) for q in quantiles]
+        elapsed = (time.perf_counter() - started) / len(quantiles)
+        errors = [abs(bisect.bisect_right(exact, estimate) / len(exact) - q) for q, estimate in zip(quantiles, estimates)]
+        print(f'{name:15} max rank error {max(errors) * 100:.2f}%, quantile query {elapsed * 1e6:.1f} us')
+
+
+if __name__ == '__main__':
+    main()
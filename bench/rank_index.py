@@ -0,0 +1,60 @@
+import argparse
+import datetime
+import os
+import random
+import statistics
+import sys
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description='RankIndex lookup latency and insert cost at a given size')
+    parser.add_argument('--entries', type=int, default=1000000)
+    parser.add_argument('--lookups', type=int, default=10000)
+    parser.add_argument('--inserts', type=int, default=2000)
+    parser.add_argument('--seed', type=int, default=42)
+    return parser.parse_args()
+
+
+def timed(fn, args_list):
+    latencies = []
+    for args in args_list:
+        started = time.perf_counter()
+        fn(*args)
+        latencies.append(time.perf_counter() - started)
+    quantiles = statistics.quantiles(latencies, n=100, method='inclusive')
+    return quantiles[49] * 1e6, quantiles[98] * 1e6
+
+
+def main():
+    args = parse_args()
+    from app.utils.rank_index import RankIndex
+
+    rng = random.Random(args.seed)
+    now = datetime.datetime.now()
+    rows = [(user_id, f'player{user_id}', rng.randint(5000, 600000), now - datetime.timedelta(seconds=rng.randint(0, 86400 * 365)))
+            for user_id in range(1, args.entries + 1)]
+
+    index = RankIndex()
+    started = time.perf_counter()
+    index.load(rows)
+    print(f'entries: {len(index)}, bulk load {time.perf_counter() - started:.2f} s')
+
+    users = [rng.randint(1, args.entries) for _ in range(args.lookups)]
+    cases = {
+        'rank': (index.rank, [(user_id,) for user_id in users]),
+        'around (radius 5)': (index.around, [(user_id, 5) for user_id in users]),
+        'page (limit 50)': (index.page, [(index._keys[rng.randrange(len(index))], 50) for _ in users]),
+        'update existing': (index.upsert, [(user_id, f'player{user_id}', rng.randint(5000, 600000), now) for user_id in users[:args.inserts]]),
+        'insert new': (index.upsert, [(args.entries + i + 1, 'new', rng.randint(5000, 600000), now) for i in range(args.inserts)])
+    }
+    for name, (fn, args_list) in cases.items():
+        p50, p99 = timed(fn, args_list)
+        print(f'{name:20} p50 {p50:8.2f} us  p99 {p99:8.2f} us')
+
+
+if __name__ == '__main__':
+    main()
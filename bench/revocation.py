@@ -0,0 +1,67 @@
+import argparse
+import os
+import sys
+import time
+import uuid
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from bench.common import add_database_args, use_database, reset_database, remove_database
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description='Cost of the per-request token revocation check')
+    add_database_args(parser, 'revocation')
+    parser.add_argument('--revoked', type=int, default=100000)
+    parser.add_argument('--checks', type=int, default=200000)
+    return parser.parse_args()
+
+
+def main():
+    args = parse_args()
+    use_database(args)
+
+    from datetime import datetime, timedelta, timezone
+    from sqlalchemy import insert
+    from app import create_app, db
+    from app.models import RevokedToken
+    from app.utils.revocation import revocation_list
+
+    app = create_app()
+    with app.app_context():
+        reset_database(db)
+        now = datetime.now(timezone.utc)
+        db.session.execute(insert(RevokedToken), [{
+            'key': uuid.uuid4().hex, 'revoked_at': now, 'expires_at': now + timedelta(days=1)
+        } for _ in range(args.revoked)])
+        db.session.commit()
+        revoked_users = args.revoked // 100
+        for user_id in range(1, revoked_users + 1):
+            revocation_list.revoke_user(user_id, timedelta(days=1))
+        db.session.commit()
+        revocation_list.rebuild()
+
+        def per_check(claims):
+            started = time.perf_counter()
+            for c in claims:
+                revocation_list.is_revoked(c)
+            return (time.perf_counter() - started) / len(claims) * 1e6
+
+        issued = time.time()
+        queries = revocation_list.probable_hits
+        clean = per_check([{'id': revoked_users + i, 'jti': uuid.uuid4().hex, 'iat': issued} for i in range(args.checks)])
+        false_positives = revocation_list.probable_hits - queries
+        queries = revocation_list.probable_hits
+        # токены, выданные до отзыва всех сессий пользователя: отсекаются по словарю, без запроса
+        user_revoked = per_check([{'id': i % revoked_users + 1, 'jti': uuid.uuid4().hex, 'iat': 0} for i in range(args.checks)])
+        print(f'revoked tokens:      {args.revoked} + {revoked_users} users')
+        print(f'check (not revoked): {clean:.2f} us')
+        print(f'check (user revoked): {user_revoked:.2f} us, {revocation_list.probable_hits - queries} queries')
+        print(f'false positives:     {false_positives} / {args.checks}')
+
+    remove_database(args.database_url)
+
+
+if __name__ == '__main__':
+    main()
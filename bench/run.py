@@ -0,0 +1,236 @@
+import argparse
+import json
+import os
+import random
+import statistics
+import subprocess
+import sys
+import threading
+import time
+from datetime import datetime, timedelta
+from types import SimpleNamespace
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from bench.common import add_database_args, use_database, reset_database
+
+SCENARIOS = ('login', 'new_record', 'get_records', 'get_personal_records', 'open_mine', 'new_record_xN', 'new_records')
+PASSWORD = 'bench-password'
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description='Load benchmark for the auth and game blueprints')
+    add_database_args(parser, 'bench')
+    parser.add_argument('--users', type=int, default=10000)
+    parser.add_argument('--records', type=int, default=30000, help='leaderboard rows, at most 3 per user')
+    parser.add_argument('--clients', type=int, default=8)
+    parser.add_argument('--requests', type=int, default=500, help='requests per scenario')
+    parser.add_argument('--scenarios', default=','.join(SCENARIOS))
+    parser.add_argument('--batch', type=int, default=10, help='runs per request in new_record_xN and new_records')
+    parser.add_argument('--bcrypt-rounds', default='4')
+    parser.add_argument('--seed', type=int, default=42)
+    parser.add_argument('--no-seed', action='store_true', help='reuse an already seeded database')
+    parser.add_argument('--output', help='result file, defaults to bench/results/<commit>.json')
+    parser.add_argument('--compare', help='previous result file to diff against')
+    return parser.parse_args()
+
+
+def git_commit():
+    try:
+        return subprocess.check_output(['git', 'rev-parse', '--short', 'HEAD'], cwd=ROOT, text=True).strip()
+    except Exception:
+        return 'unknown'
+
+
+def seed(db, args, rng):
+    from sqlalchemy import insert
+    from app.models import User, Leaderboard, Difficulty
+    from app.utils.passwords import password_hasher
+
+    users, records = args.users, args.records
+    reset_database(db)
+    hashed = password_hasher.hash(PASSWORD)
+
+    for start in range(0, users, 10000):
+        db.session.execute(insert(User), [{
+            'id': i + 1,
+            'username': f'player{i}',
+            'password': hashed,
+            'role': 'player',
+            'coins': 10 ** 9,
+            'email': f'player{i}@bench.local',
+            'is_verified': True,
+            'enabled_2fa': False,
+            'attempts': 0
+        } for i in range(start, min(start + 10000, users))])
+
+    difficulties = list(Difficulty)
+    slots = [(user, difficulty) for difficulty in difficulties for user in range(users)][:min(records, users * 3)]
+    now = datetime.now()
+    for start in range(0, len(slots), 10000):
+        db.session.execute(insert(Leaderboard), [{
+            'created_at': now - timedelta(seconds=rng.randint(0, 86400 * 30)),
+            'milliseconds': rng.randint(5000, 600000),
+            'username': f'player{user}',
+            'user_id': user + 1,
+            'difficulty': difficulty
+        } for user, difficulty in slots[start:start + 10000]])
+    db.session.commit()
+
+
+def build_requests(scenario, users, tokens, rng, batch):
+    def run():
+        return {'milliseconds': rng.randint(1000, 600000), 'difficulty': rng.choice(('easy', 'medium', 'hard'))}
+
+    def request(client):
+        user = rng.randrange(users)
+        headers = {'x-access-token': tokens[user]}
+        if scenario == 'login':
+            return client.post('/login', json={'username': f'player{user}', 'password': PASSWORD})
+        if scenario == 'new_record':
+            return client.post('/new_record', json=run(), headers=headers)
+        if scenario == 'new_record_xN':
+            # очередь офлайн-забегов, отправленная по одному: ответ с ошибкой, если она была, иначе последний
+            responses = [client.post('/new_record', json=run(), headers=headers) for _ in range(batch)]
+            return next((r for r in responses if r.status_code >= 400), responses[-1])
+        if scenario == 'new_records':
+            return client.post('/new_records', json=[run() for _ in range(batch)], headers=headers)
+        if scenario == 'get_records':
+            return client.get('/get_records')
+        if scenario == 'get_personal_records':
+            return client.get('/get_personal_records', headers=headers)
+        return client.get('/open_mine', headers=headers)
+    return request
+
+
+def run_scenario(app, scenario, clients, total, request):
+    latencies = []
+    errors = [0]
+    lock = threading.Lock()
+    remaining = [total]
+
+    def worker():
+        client = app.test_client()
+        while True:
+            with lock:
+                if remaining[0] <= 0:
+                    return
+                remaining[0] -= 1
+            started = time.perf_counter()
+            response = request(client)
+            elapsed = time.perf_counter() - started
+            with lock:
+                latencies.append(elapsed)
+                if response.status_code >= 400:
+                    errors[0] += 1
+
+    started = time.perf_counter()
+    threads = [threading.Thread(target=worker) for _ in range(clients)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    wall = time.perf_counter() - started
+
+    quantiles = statistics.quantiles(latencies, n=100, method='inclusive')
+    return {
+        'requests': len(latencies),
+        'errors': errors[0],
+        'throughput_rps': round(len(latencies) / wall, 1),
+        'p50_ms': round(quantiles[49] * 1000, 3),
+        'p95_ms': round(quantiles[94] * 1000, 3),
+        'p99_ms': round(quantiles[98] * 1000, 3)
+    }
+
+
+def route_queries(metrics, method, rule):
+    queries = [series[1] for (m, r, _), series in metrics._routes.items() if m == method and r == rule]
+    return sum(h.sum for h in queries), sum(h.count for h in queries)
+
+
+def queries_per_request(metrics, method, rule, before=(0, 0)):
+    # new_record и new_record_xN пишут в одну гистограмму, поэтому считаем разницу за сценарий
+    total, count = route_queries(metrics, method, rule)
+    total, count = total - before[0], count - before[1]
+    return round(total / count, 2) if count else None
+
+
+def compare(current, previous_path):
+    with open(previous_path) as f:
+        previous = json.load(f)
+    print(f"\nvs {previous['commit']}:")
+    for scenario, result in current['results'].items():
+        before = previous['results'].get(scenario)
+        if not before:
+            continue
+        rps = (result['throughput_rps'] / before['throughput_rps'] - 1) * 100 if before['throughput_rps'] else 0
+        p99 = (result['p99_ms'] / before['p99_ms'] - 1) * 100 if before['p99_ms'] else 0
+        print(f"  {scenario:22} throughput {rps:+6.1f}%  p99 {p99:+6.1f}%")
+
+
+def main():
+    args = parse_args()
+    use_database(args, drop=not args.no_seed)
+    os.environ['bcrypt_rounds'] = args.bcrypt_rounds
+    os.environ.setdefault('slow_request_ms', '600000')
+
+    from app import create_app, db
+    from app.metrics import metrics
+    from app.utils.token import generate_token
+
+    rng = random.Random(args.seed)
+    app = create_app()
+    with app.app_context():
+        if not args.no_seed:
+            print(f'Seeding {args.users} users and {args.records} leaderboard rows...')
+            seed(db, args, rng)
+        tokens = [generate_token(SimpleNamespace(id=i + 1, username=f'player{i}', role='player')) for i in range(args.users)]
+
+    routes = {
+        'login': ('POST', '/login'),
+        'new_record': ('POST', '/new_record'),
+        'get_records': ('GET', '/get_records'),
+        'get_personal_records': ('GET', '/get_personal_records'),
+        'open_mine': ('GET', '/open_mine'),
+        'new_record_xN': ('POST', '/new_record'),
+        'new_records': ('POST', '/new_records')
+    }
+    results = {}
+    for scenario in args.scenarios.split(','):
+        before = route_queries(metrics, *routes[scenario])
+        result = run_scenario(app, scenario, args.clients, args.requests, build_requests(scenario, args.users, tokens, rng, args.batch))
+        result['queries_per_request'] = queries_per_request(metrics, *routes[scenario], before)
+        results[scenario] = result
+        print(f"{scenario:22} {result['throughput_rps']:8.1f} req/s  p50 {result['p50_ms']:8.2f} ms  "
+              f"p95 {result['p95_ms']:8.2f} ms  p99 {result['p99_ms']:8.2f} ms  "
+              f"{result['queries_per_request']} q/req  {result['errors']} errors")
+
+    # N забегов одним /new_records против N отдельных /new_record
+    batched = [results[s] for s in ('new_record_xN', 'new_records') if s in results]
+    if len(batched) == 2:
+        single, batch = batched
+        single_queries = round(single['queries_per_request'] * args.batch, 2) if single['queries_per_request'] is not None else None
+        print(f"\n{f'{args.batch} x new_record':22} {single['throughput_rps'] * args.batch:8.1f} runs/s  "
+              f"p50 {single['p50_ms']:8.2f} ms per batch  {single_queries} q/batch")
+        print(f"{f'new_records[{args.batch}]':22} {batch['throughput_rps'] * args.batch:8.1f} runs/s  "
+              f"p50 {batch['p50_ms']:8.2f} ms per batch  {batch['queries_per_request']} q/batch")
+
+    report = {
+        'commit': git_commit(),
+        'timestamp': datetime.now().isoformat(),
+        'config': {k: v for k, v in vars(args).items() if k not in ('output', 'compare')},
+        'results': results
+    }
+    output = args.output or os.path.join(ROOT, 'bench', 'results', f"{report['commit']}.json")
+    os.makedirs(os.path.dirname(output), exist_ok=True)
+    with open(output, 'w') as f:
+        json.dump(report, f, indent=2)
+    print(f'Saved {output}')
+
+    if args.compare:
+        compare(report, args.compare)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,68 @@
+import argparse
+import os
+import sys
+import time
+from datetime import datetime, timezone
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from bench.common import add_database_args, use_database, reset_database, remove_database
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description='Rows/sec of to_dict + jsonify against the schema serializers')
+    add_database_args(parser, 'serializers')
+    parser.add_argument('--rows', type=int, default=100000)
+    parser.add_argument('--repeat', type=int, default=3)
+    return parser.parse_args()
+
+
+def best_of(repeat, fn):
+    timings = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        fn()
+        timings.append(time.perf_counter() - started)
+    return min(timings)
+
+
+def main():
+    args = parse_args()
+    use_database(args)
+
+    from flask import jsonify
+    from sqlalchemy import insert
+    from app import create_app, db
+    from app.models import User, Leaderboard, Difficulty
+    from app.utils.serializers import leaderboard_schema, user_schema, dumps
+
+    app = create_app()
+    with app.test_request_context():
+        reset_database(db)
+        now = datetime.now()
+        db.session.execute(insert(User), [{
+            'id': i + 1, 'username': f'player{i}', 'password': 'x' * 60, 'role': 'player', 'coins': 10,
+            'email': f'player{i}@bench.local', 'is_verified': True, 'enabled_2fa': False, 'attempts': 0,
+            'ban_until': datetime.now(timezone.utc)
+        } for i in range(args.rows)])
+        db.session.execute(insert(Leaderboard), [{
+            'created_at': now, 'milliseconds': i, 'username': f'player{i}', 'user_id': i + 1, 'difficulty': Difficulty.easy
+        } for i in range(args.rows)])
+        db.session.commit()
+
+        cases = {
+            'leaderboard to_dict+jsonify': lambda: jsonify([r.to_dict() for r in Leaderboard.query.all()]).get_data(),
+            'leaderboard schema': lambda: dumps(leaderboard_schema.rows(db.session.execute(leaderboard_schema.select('public')), 'public')),
+            'users to_dict+jsonify': lambda: jsonify([u.to_dict() for u in User.query.all()]).get_data(),
+            'users schema (admin view)': lambda: dumps(user_schema.rows(db.session.execute(user_schema.select('admin')), 'admin'))
+        }
+        for name, fn in cases.items():
+            elapsed = best_of(args.repeat, lambda: (fn(), db.session.expunge_all()))
+            print(f'{name:30} {args.rows / elapsed:12.0f} rows/s')
+
+    remove_database(args.database_url)
+
+
+if __name__ == '__main__':
+    main()
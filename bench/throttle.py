@@ -0,0 +1,81 @@
+import argparse
+import os
+import statistics
+import sys
+import tempfile
+import time
+import tracemalloc
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description='Login throttle rejection cost and memory per tracked key')
+    parser.add_argument('--keys', type=int, default=100000)
+    parser.add_argument('--checks', type=int, default=200000)
+    parser.add_argument('--requests', type=int, default=2000, help='throttled /login requests through the app')
+    return parser.parse_args()
+
+
+def per_call(fn, calls):
+    started = time.perf_counter()
+    for i in range(calls):
+        fn(i)
+    return (time.perf_counter() - started) / calls * 1e9
+
+
+def main():
+    args = parse_args()
+    db_path = os.path.join(tempfile.mkdtemp(prefix='saper-bench-'), 'throttle.db')
+    os.environ['database_url'] = f'sqlite:///{db_path}'
+
+    from app import create_app, db
+    from app.utils.throttle import LoginThrottle, SlidingWindowLimiter, login_throttle
+
+    # стоимость проверки и отказа в самом ограничителе
+    throttle = LoginThrottle()
+    for _ in range(throttle.by_username.limit):
+        throttle.fail('10.0.0.1', 'victim')
+    print(f'retry_after, allowed    {per_call(lambda i: throttle.retry_after("10.0.0.2", "other"), args.checks):8.0f} ns')
+    print(f'retry_after, rejected   {per_call(lambda i: throttle.retry_after("10.0.0.2", "victim"), args.checks):8.0f} ns')
+    print(f'fail                    {per_call(lambda i: throttle.fail(f"10.1.{i % 250}.{i % 251}", "victim"), args.checks):8.0f} ns')
+
+    # память на ключ: по уникальному адресу на каждый hit, без вытеснения
+    limiter = SlidingWindowLimiter(20, 300, max_keys=args.keys * 2)
+    keys = [f'10.{i >> 16 & 255}.{i >> 8 & 255}.{i & 255}' for i in range(args.keys)]
+    tracemalloc.start()
+    before = tracemalloc.get_traced_memory()[0]
+    for key in keys:
+        limiter.hit(key)
+    per_key = (tracemalloc.get_traced_memory()[0] - before) / args.keys
+    tracemalloc.stop()
+    print(f'memory per key          {per_key:8.0f} bytes ({len(limiter)} keys)')
+
+    # при заполненном лимите каждый новый ключ вытесняет самый старый
+    full = SlidingWindowLimiter(20, 300, max_keys=args.keys)
+    for key in keys:
+        full.hit(key)
+    print(f'hit with eviction       {per_call(lambda i: full.hit(f"new-{i}"), args.checks):8.0f} ns')
+
+    # отказ целиком через /login: до хэширования и SQL
+    app = create_app()
+    with app.app_context():
+        db.create_all()
+    client = app.test_client()
+    for _ in range(login_throttle.by_username.limit):
+        login_throttle.fail('127.0.0.1', 'victim')
+    latencies = []
+    for _ in range(args.requests):
+        started = time.perf_counter()
+        response = client.post('/login', json={'username': 'victim', 'password': 'guess'})
+        latencies.append(time.perf_counter() - started)
+        assert response.status_code == 429
+    quantiles = statistics.quantiles(latencies, n=100, method='inclusive')
+    print(f'throttled /login        p50 {quantiles[49] * 1e6:8.0f} us  p99 {quantiles[98] * 1e6:8.0f} us')
+
+    os.remove(db_path)
+
+
+if __name__ == '__main__':
+    main()
@@ -9,5 +9,33 @@ DB_HOST = os.getenv("host")
 DB_PORT = os.getenv("port")
 DB_NAME = os.getenv("dbname")
 
+DATABASE_URL = os.getenv("database_url") or f'postgresql://{DB_USER}:{DB_PASSWORD}@{DB_HOST}:{DB_PORT}/{DB_NAME}'
+DB_REPLICA_URLS = [url.strip() for url in os.getenv("replica_urls", "").split(",") if url.strip()]
+DB_POOL_SIZE = int(os.getenv("db_pool_size", "10"))
+DB_MAX_OVERFLOW = int(os.getenv("db_max_overflow", "20"))
+DB_POOL_TIMEOUT = int(os.getenv("db_pool_timeout", "10"))
+DB_POOL_RECYCLE = int(os.getenv("db_pool_recycle", "1800"))
+DB_STATEMENT_TIMEOUT = int(os.getenv("db_statement_timeout", "5000"))
+DB_STICKY_SECONDS = float(os.getenv("db_sticky_seconds", "5"))
+
 SENDER_MAIL = os.getenv("sender_mail")
-SENDER_PASSWORD = str(os.getenv("sender_password"))
\ No newline at end of file
+SENDER_PASSWORD = str(os.getenv("sender_password"))
+
+SMTP_HOST = os.getenv("smtp_host", "smtp.gmail.com")
+SMTP_PORT = int(os.getenv("smtp_port", "465"))
+SMTP_SSL = os.getenv("smtp_ssl", "true").lower() == "true"
+
+BCRYPT_ROUNDS = int(os.getenv("bcrypt_rounds", "12"))
+HASH_WORKERS = int(os.getenv("hash_workers", "4"))
+
+SLOW_REQUEST_MS = int(os.getenv("slow_request_ms", "500"))
+METRICS_TOKEN = os.getenv("metrics_token")
+
+ACCESS_TOKEN_MINUTES = int(os.getenv("access_token_minutes", "15"))
+REFRESH_TOKEN_DAYS = int(os.getenv("refresh_token_days", "30"))
+
+COLD_START_BUDGET_MS = int(os.getenv("cold_start_budget_ms", "1000"))
+
+IDEMPOTENCY_TTL = int(os.getenv("idempotency_ttl", "86400"))
+IDEMPOTENCY_MAX_MB = int(os.getenv("idempotency_max_mb", "32"))
+IDEMPOTENCY_DB = os.getenv("idempotency_db", "false").lower() == "true"
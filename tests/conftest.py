@@ -0,0 +1,90 @@
+import os
+import sys
+import tempfile
+import threading
+from contextlib import contextmanager
+import pytest
+from sqlalchemy import event
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+# config.py читает окружение при импорте, поэтому базу задаём до импорта приложения;
+# database_url=postgresql://... прогоняет те же тесты на PostgreSQL
+_db_dir = tempfile.mkdtemp(prefix='saper-tests-')
+os.environ.setdefault('database_url', f'sqlite:///{os.path.join(_db_dir, "test.db")}')
+os.environ.setdefault('bcrypt_rounds', '4')
+
+from app import create_app, db as _db
+from app.models import User
+from app.utils.token import generate_token
+from app.utils.user_cache import user_cache
+
+
+@pytest.fixture(scope='session')
+def app():
+    return create_app()
+
+
+@pytest.fixture
+def db(app):
+    with app.app_context():
+        _db.drop_all()
+        _db.create_all()
+        yield _db
+        _db.session.remove()
+
+
+@pytest.fixture
+def make_user(app, db):
+    def make_user(username, coins=10):
+        user = User(username=username, password='x' * 60, email=f'{username}@test.local',
+                    coins=coins, is_verified=True, attempts=0)
+        db.session.add(user)
+        db.session.commit()
+        user_cache.invalidate(user.id)
+        return user.id, generate_token(user)
+    return make_user
+
+
+@pytest.fixture
+def count_queries(db):
+    @contextmanager
+    def count_queries():
+        statements = []
+
+        def before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+            statements.append(statement)
+
+        event.listen(db.engine, 'before_cursor_execute', before_cursor_execute)
+        try:
+            yield statements
+        finally:
+            event.remove(db.engine, 'before_cursor_execute', before_cursor_execute)
+    return count_queries
+
+
+@pytest.fixture
+def run_concurrently(app):
+    def run_concurrently(requests):
+        # requests: по списку (method, url, json, headers) на поток, все потоки стартуют одновременно;
+        # возвращает (url, status, json) всех ответов
+        barrier = threading.Barrier(len(requests))
+        responses = []
+        lock = threading.Lock()
+
+        def worker(calls):
+            client = app.test_client()
+            barrier.wait()
+            for method, url, body, headers in calls:
+                response = client.open(url, method=method, json=body, headers=headers)
+                with lock:
+                    responses.append((url, response.status_code, response.get_json()))
+
+        threads = [threading.Thread(target=worker, args=(calls,)) for calls in requests]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        return responses
+    return run_concurrently
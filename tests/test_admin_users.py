@@ -0,0 +1,21 @@
+import json
+from datetime import datetime, timezone
+from app.models import User
+
+
+def test_users_listing_keeps_rfc822_ban_until(app, db, make_user):
+    admin_id, token = make_user('admin')
+    banned_id, _ = make_user('banned')
+    db.session.get(User, admin_id).role = 'admin'
+    db.session.get(User, banned_id).ban_until = datetime(2030, 1, 2, 3, 4, 5, tzinfo=timezone.utc)
+    db.session.commit()
+    client = app.test_client()
+    headers = {'x-access-token': token}
+
+    # тот же формат, что отдавал jsonify до перехода на схемы
+    expected = {admin_id: None, banned_id: 'Wed, 02 Jan 2030 03:04:05 GMT'}
+    users = client.get('/users', headers=headers).get_json()['users']
+    assert {user['id']: user['ban_until'] for user in users} == expected
+
+    lines = client.get('/users?format=ndjson', headers=headers).get_data(as_text=True).splitlines()
+    assert {user['id']: user['ban_until'] for user in map(json.loads, lines)} == expected
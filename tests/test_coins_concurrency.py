@@ -0,0 +1,54 @@
+from sqlalchemy import func
+from app.models import User, CoinLedger, Background, UserBackground
+from app.utils.coins import ledger_writer
+
+THREADS = 4
+REQUESTS_PER_THREAD = 40
+OPEN_MINE_PRICE = 10
+
+
+def _ledger_sum(db, user_id):
+    ledger_writer.flush()
+    return db.session.query(func.coalesce(func.sum(CoinLedger.delta), 0)).filter_by(user_id=user_id).scalar()
+
+
+def test_open_mine_never_overdraws(app, db, make_user, run_concurrently):
+    start = 100
+    user_id, token = make_user('miner', coins=start)
+    headers = {'x-access-token': token}
+
+    statuses = run_concurrently([[('GET', '/open_mine', None, headers)] * REQUESTS_PER_THREAD] * THREADS)
+
+    paid = [status for _, status, body in statuses if status == 201]
+    refused = [status for _, status, body in statuses if status == 200 and body == {'message': 'neok'}]
+    assert len(paid) == start // OPEN_MINE_PRICE
+    assert len(paid) + len(refused) == THREADS * REQUESTS_PER_THREAD
+
+    balance = db.session.get(User, user_id).coins
+    assert balance == start - len(paid) * OPEN_MINE_PRICE == 0
+    assert _ledger_sum(db, user_id) == balance - start
+
+
+def test_mixed_debits_and_credits_do_not_drift(app, db, make_user, run_concurrently):
+    start = 1000
+    user_id, token = make_user('trader', coins=start)
+    headers = {'x-access-token': token}
+    db.session.add_all([Background(id=i, price=30) for i in range(1, 6)])
+    db.session.commit()
+
+    # покупки фонов, open_mine и рекорды (начисления) одновременно из разных потоков
+    requests = [
+        [('GET', '/open_mine', None, headers)] * REQUESTS_PER_THREAD,
+        [('POST', '/add_bg', {'id': i % 5 + 1}, headers) for i in range(REQUESTS_PER_THREAD)],
+        [('POST', '/new_record', {'milliseconds': 90000 - i, 'difficulty': 'easy'}, headers) for i in range(REQUESTS_PER_THREAD)],
+        [('GET', '/open_mine', None, headers)] * REQUESTS_PER_THREAD
+    ]
+    statuses = run_concurrently(requests)
+
+    assert all(status in (200, 201, 400) for _, status, _ in statuses)
+    owned = UserBackground.query.filter_by(user_id=user_id).count()
+    assert owned == len([1 for url, status, _ in statuses if url == '/add_bg' and status == 201]) <= 5
+
+    balance = db.session.get(User, user_id).coins
+    assert balance >= 0
+    assert _ledger_sum(db, user_id) == balance - start
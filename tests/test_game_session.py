@@ -0,0 +1,32 @@
+import numpy as np
+from app.models import Difficulty
+from app.utils.game_session import GameSession
+
+
+def _session_with_mines(positions):
+    session = GameSession(user_id=1, difficulty=Difficulty.easy, seed=0)
+    mines = np.zeros((session.rows, session.cols), dtype=bool)
+    for row, col in positions:
+        mines[row, col] = True
+    session.mines = session._pack(mines)
+    session.started_at = 0
+    return session
+
+
+def test_cascade_stops_at_flags():
+    # нижний ряд заминирован целиком, плюс мина в правом верхнем углу
+    session = _session_with_mines([(8, col) for col in range(9)] + [(0, 8)])
+    # флажок на пустой клетке внутри каскада и на числовой клетке на его границе
+    for row, col in [(0, 0), (7, 4)]:
+        assert session.toggle_flag(row, col)
+
+    cells = session.reveal(4, 4)
+
+    opened = {(row, col) for row, col, _ in cells}
+    assert (0, 0) not in opened and (7, 4) not in opened
+    assert len(opened) == 9 * 9 - 10 - 2
+    assert session.status == 'playing'
+
+    # после снятия флажка клетка открывается обычным ходом
+    assert not session.toggle_flag(0, 0)
+    assert session.reveal(0, 0) == [[0, 0, 0]]
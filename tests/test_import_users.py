@@ -0,0 +1,32 @@
+import json
+from app.models import User
+
+VALID_HASH = '$2b$04$' + 'a' * 53
+
+
+def test_rejects_never_contain_passwords(app, db, tmp_path):
+    users = tmp_path / 'users.jsonl'
+    rows = [
+        {'username': 'alice', 'email': 'alice@test.local', 'password': 'alice-secret'},
+        {'username': 'alice', 'email': 'alice2@test.local', 'password': 'dup-secret'},
+        {'username': 'bob', 'email': 'not-an-email', 'password': 'bob-secret'},
+        {'username': 'carol', 'email': 'carol@test.local', 'password_hash': VALID_HASH + 'x' * 40},
+        {'username': 'dave', 'email': 'dave@test.local', 'password_hash': VALID_HASH}
+    ]
+    users.write_text(''.join(json.dumps(row) + '\n' for row in rows), encoding='utf-8')
+    rejects = tmp_path / 'rejects.jsonl'
+
+    result = app.test_cli_runner().invoke(args=[
+        'import-users', str(users), '--workers', '1', '--rounds', '4', '--rejects', str(rejects)
+    ])
+    assert result.exit_code == 0, result.output
+
+    assert sorted(u.username for u in User.query.all()) == ['alice', 'dave']
+    content = rejects.read_text(encoding='utf-8')
+    assert 'secret' not in content and VALID_HASH not in content
+    reasons = {entry['row']['username']: entry['reason'] for entry in map(json.loads, content.splitlines())}
+    assert reasons == {
+        'alice': 'duplicate in file',
+        'bob': 'invalid email format',
+        'carol': 'password_hash is too long for a bcrypt hash'
+    }
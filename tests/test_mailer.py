@@ -0,0 +1,51 @@
+from email.mime.text import MIMEText
+from app.utils.email import Mailer
+
+
+class FlakySmtp:
+    def __init__(self, failures):
+        self.failures = failures
+        self.delivered = []
+
+    def sendmail(self, sender, recipient, message):
+        if self.failures:
+            self.failures -= 1
+            raise ConnectionError('temporary failure')
+        self.delivered.append(recipient)
+
+    def quit(self):
+        pass
+
+
+class FlakyMailer(Mailer):
+    def __init__(self, server, **kwargs):
+        super().__init__(**kwargs)
+        self.server = server
+
+    def _connect(self):
+        return self.server
+
+
+def test_join_waits_for_scheduled_retries():
+    server = FlakySmtp(failures=4)
+    mailer = FlakyMailer(server, workers=2, retries=5, backoff=0.02)
+    recipients = [f'player{i}@test.local' for i in range(4)]
+    for recipient in recipients:
+        assert mailer.enqueue(recipient, MIMEText('code'))
+
+    mailer.join()
+
+    # сбоев меньше, чем попыток на письмо, поэтому к возврату join доставлено всё
+    assert sorted(server.delivered) == recipients
+    assert mailer.sent == len(recipients)
+    assert not mailer.dead_letters
+
+
+def test_join_returns_after_retries_are_exhausted():
+    mailer = FlakyMailer(FlakySmtp(failures=100), workers=1, retries=2, backoff=0.05)
+    mailer.enqueue('lost@test.local', MIMEText('code'))
+
+    mailer.join()
+
+    assert mailer.sent == 0
+    assert [recipient for recipient, _, _ in mailer.dead_letters] == ['lost@test.local']
@@ -0,0 +1,26 @@
+import re
+
+SAMPLE = re.compile(r'^([a-z_]+?)(?:_bucket|_sum|_count)?(?:\{.*\})? \S+$')
+
+
+def test_metric_families_are_contiguous(app, db, make_user):
+    _, token = make_user('watcher')
+    client = app.test_client()
+    # несколько маршрутов и статусов, чтобы у каждого семейства было больше одной серии
+    client.get('/get_records')
+    client.get('/get_coins', headers={'x-access-token': token})
+    client.get('/get_coins')
+
+    body = client.get('/metrics').get_data(as_text=True)
+    families = []
+    current = None
+    for line in body.splitlines():
+        if line.startswith('# TYPE '):
+            current = line.split()[2]
+            assert current not in families, f'{current} declared twice'
+            families.append(current)
+            continue
+        name = SAMPLE.match(line).group(1)
+        assert name == current, f'{line!r} outside of {current}'
+
+    assert families.index('saper_request_queries') == families.index('saper_request_duration_seconds') + 1
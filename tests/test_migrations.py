@@ -0,0 +1,73 @@
+import datetime
+from sqlalchemy import Column, DateTime, Enum, Integer, MetaData, String, Table, insert, inspect, select, text
+from app.models import Leaderboard, Difficulty
+
+
+def _baseline_leaderboard(db):
+    # таблица в том виде, в каком её создавала прошлая версия: без уникального ключа и индекса
+    baseline = Table(
+        'leaderboard', MetaData(),
+        Column('id', Integer, primary_key=True),
+        Column('created_at', DateTime),
+        Column('milliseconds', Integer, nullable=False),
+        Column('username', String(50), nullable=False),
+        Column('user_id', Integer, nullable=False),
+        Column('difficulty', Enum(Difficulty), nullable=False)
+    )
+    connection = db.session.connection()
+    Leaderboard.__table__.drop(connection)
+    baseline.create(connection)
+    db.session.commit()
+
+
+def test_migrate_leaderboard_dedupes_and_enables_upsert(app, db, make_user):
+    user_id, token = make_user('veteran')
+    _baseline_leaderboard(db)
+    now = datetime.datetime.now()
+    db.session.execute(insert(Leaderboard), [
+        {'created_at': now, 'milliseconds': ms, 'username': 'veteran', 'user_id': user_id, 'difficulty': difficulty}
+        for difficulty, ms in [(Difficulty.easy, 9000), (Difficulty.easy, 7000), (Difficulty.easy, 7000),
+                               (Difficulty.easy, 8000), (Difficulty.hard, 50000)]
+    ])
+    db.session.commit()
+
+    runner = app.test_cli_runner()
+    result = runner.invoke(args=['migrate-leaderboard'])
+    assert result.exit_code == 0, result.output
+    assert 'Removed 3 duplicate' in result.output
+    # повторный запуск ничего не ломает
+    assert runner.invoke(args=['migrate-leaderboard']).exit_code == 0
+
+    rows = db.session.execute(select(Leaderboard.difficulty, Leaderboard.milliseconds).order_by(Leaderboard.difficulty)).all()
+    assert rows == [(Difficulty.easy, 7000), (Difficulty.hard, 50000)]
+
+    response = app.test_client().post('/new_record', json={'milliseconds': 6000, 'difficulty': 'easy'},
+                                      headers={'x-access-token': token})
+    assert response.status_code in (200, 201)
+    assert db.session.execute(select(Leaderboard.milliseconds).where(Leaderboard.difficulty == Difficulty.easy)).scalars().all() == [6000]
+
+
+def test_migrate_backgrounds_requires_and_seeds_the_catalog(app, db, make_user, tmp_path):
+    user_id, token = make_user('collector', coins=100)
+    db.session.execute(text("ALTER TABLE \"user\" ADD COLUMN available_bg VARCHAR(255) DEFAULT ''"))
+    db.session.execute(text('UPDATE "user" SET available_bg = :owned WHERE id = :id'), {'owned': '1,3,', 'id': user_id})
+    db.session.commit()
+    runner = app.test_cli_runner()
+
+    # без прайс-листа каталог остался бы пустым, и покупки отвечали бы 404
+    result = runner.invoke(args=['migrate-backgrounds'])
+    assert result.exit_code != 0
+    assert 'available_bg' in {c['name'] for c in inspect(db.engine).get_columns('user')}
+
+    prices = tmp_path / 'prices.csv'
+    prices.write_text('id,price\n1,0\n2,40\n3,60\n', encoding='utf-8')
+    result = runner.invoke(args=['migrate-backgrounds', '--prices', str(prices)])
+    assert result.exit_code == 0, result.output
+    db.session.remove()
+
+    client = app.test_client()
+    assert client.get('/get_backgrounds').get_json() == [{'id': 1, 'price': 0}, {'id': 2, 'price': 40}, {'id': 3, 'price': 60}]
+    headers = {'x-access-token': token}
+    assert client.get('/get_available_bg', headers=headers).get_json() == {'available_bg': '1,3,'}
+    assert client.post('/add_bg', json={'id': 2}, headers=headers).status_code == 201
+    assert client.get('/get_coins', headers=headers).get_json() == {'coins': 60}
@@ -0,0 +1,54 @@
+import datetime
+import random
+from sqlalchemy import insert
+from app.models import User, PeriodBoard, Difficulty
+from app.utils.period_boards import BOARD_SIZE, PERIODS, period_key, board_rows, update_period_boards
+
+USERS = 150
+
+
+def _seed_users(db):
+    db.session.execute(insert(User), [{
+        'id': i, 'username': f'player{i}', 'password': 'x' * 60, 'email': f'player{i}@test.local',
+        'coins': 0, 'is_verified': True, 'attempts': 0
+    } for i in range(1, USERS + 1)])
+    db.session.commit()
+
+
+def test_boards_keep_exact_top_n(app, db):
+    _seed_users(db)
+    rng = random.Random(7)
+    started = datetime.datetime(2026, 10, 18, 12, 0)
+    best = {}
+    for i in range(600):
+        user_id = rng.randint(1, USERS)
+        milliseconds = rng.randint(1000, 5000)
+        created_at = started + datetime.timedelta(seconds=i)
+        update_period_boards(user_id, f'player{user_id}', milliseconds, Difficulty.easy, created_at)
+        db.session.commit()
+        if user_id not in best or milliseconds < best[user_id][0]:
+            best[user_id] = (milliseconds, created_at)
+
+    expected = sorted((ms, created_at, user_id) for user_id, (ms, created_at) in best.items())[:BOARD_SIZE]
+    for kind in PERIODS:
+        period = period_key(kind, started.date())
+        rows = board_rows(period, Difficulty.easy)
+        assert [(row['milliseconds'], row['user_id']) for row in rows] == [(ms, user_id) for ms, _, user_id in expected]
+        assert db.session.query(PeriodBoard).filter_by(period=period).count() == BOARD_SIZE
+
+
+def test_board_checks_are_cheap_for_slow_runs_and_known_players(app, db, count_queries):
+    _seed_users(db)
+    created_at = datetime.datetime(2026, 10, 18, 12, 0)
+    for user_id in range(1, BOARD_SIZE + 1):
+        update_period_boards(user_id, f'player{user_id}', 1000 + user_id, Difficulty.easy, created_at)
+    db.session.commit()
+
+    with count_queries() as statements:
+        assert update_period_boards(USERS, f'player{USERS}', 9999, Difficulty.easy, created_at) == []
+        # игрок уже на досках: порог не нужен, только обновление
+        assert len(update_period_boards(1, 'player1', 500, Difficulty.easy, created_at)) == len(PERIODS)
+    db.session.rollback()
+
+    # места игрока одним запросом + порог дневной доски; затем места + три обновления
+    assert len(statements) == 2 + (1 + len(PERIODS))
@@ -0,0 +1,20 @@
+def test_page_and_around_clamp_their_arguments(app, db, make_user):
+    client = app.test_client()
+    users = [make_user(f'ranked{i}') for i in range(3)]
+    for i, (_, token) in enumerate(users):
+        response = client.post('/new_record', json={'milliseconds': 10000 + i, 'difficulty': 'medium'},
+                               headers={'x-access-token': token})
+        assert response.status_code in (200, 201)
+
+    # limit=0 раньше падал с IndexError на records[-1]
+    for limit in (0, -5):
+        response = client.get(f'/get_records_page?difficulty=medium&limit={limit}')
+        assert response.status_code == 200
+        assert len(response.get_json()['records']) == 1
+        assert response.get_json()['next'] is not None
+
+    # отрицательный радиус — это только своя строка, а не пустое окно
+    user_id, token = users[1]
+    response = client.get('/get_records_around?difficulty=medium&radius=-3', headers={'x-access-token': token})
+    assert response.status_code == 200
+    assert [row['user_id'] for row in response.get_json()] == [user_id]
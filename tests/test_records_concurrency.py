@@ -0,0 +1,64 @@
+from sqlalchemy import func
+from app.models import Leaderboard, User, Difficulty, CoinLedger
+from app.utils.coins import ledger_writer
+from app.utils.records import TOP_SIZE, RECORD_REWARD, TOP_REWARD
+
+USERS = 2 * TOP_SIZE
+RUNS_PER_USER = 5
+START_COINS = 10
+
+
+def _submit_all(run_concurrently, tokens, times):
+    # один поток на пользователя
+    responses = run_concurrently([
+        [('POST', '/new_record', {'milliseconds': milliseconds, 'difficulty': difficulty.value}, {'x-access-token': token})
+         for difficulty, milliseconds in user_times]
+        for token, user_times in zip(tokens, times)
+    ])
+    assert [status for _, status, _ in responses if status not in (200, 201)] == []
+
+
+def _times(user_index):
+    # у каждого пользователя свой непересекающийся диапазон, каждый следующий забег быстрее
+    base = 10000 + user_index * 1000
+    return [(difficulty, base + 100 * (RUNS_PER_USER - run))
+            for difficulty in Difficulty for run in range(RUNS_PER_USER)]
+
+
+def test_concurrent_submissions_keep_top_and_coins_consistent(app, db, make_user, run_concurrently):
+    users = [make_user(f'player{i}', coins=START_COINS) for i in range(USERS)]
+
+    # сначала будущий топ, затем остальные: так попадание в топ каждой отправки известно заранее
+    _submit_all(run_concurrently, [token for _, token in users[:TOP_SIZE]], [_times(i) for i in range(TOP_SIZE)])
+    _submit_all(run_concurrently, [token for _, token in users[TOP_SIZE:]], [_times(i) for i in range(TOP_SIZE, USERS)])
+
+    improvements = len(Difficulty) * RUNS_PER_USER
+    expected_coins = (USERS * START_COINS
+                      + TOP_SIZE * improvements * (RECORD_REWARD + TOP_REWARD)
+                      + TOP_SIZE * improvements * RECORD_REWARD)
+    assert db.session.query(func.sum(User.coins)).scalar() == expected_coins
+
+    assert Leaderboard.query.count() == USERS * len(Difficulty)
+    for difficulty in Difficulty:
+        top = (Leaderboard.query.filter_by(difficulty=difficulty)
+               .order_by(Leaderboard.milliseconds).limit(TOP_SIZE).all())
+        assert [(row.user_id, row.milliseconds) for row in top] == [
+            (user_id, min(ms for d, ms in _times(i) if d == difficulty))
+            for i, (user_id, _) in enumerate(users[:TOP_SIZE])
+        ]
+
+
+def test_concurrent_submissions_for_one_user_keep_single_best(app, db, make_user, run_concurrently):
+    user_id, token = make_user('racer', coins=START_COINS)
+    times = [[(Difficulty.hard, 50000 - thread * 100 - run) for run in range(10)] for thread in range(8)]
+
+    _submit_all(run_concurrently, [token] * len(times), times)
+
+    rows = Leaderboard.query.filter_by(user_id=user_id).all()
+    assert [(row.difficulty, row.milliseconds) for row in rows] == [(Difficulty.hard, min(ms for ts in times for _, ms in ts))]
+    # каждая засчитанная отправка — ровно одна награда, и каждая видна в журнале монет
+    ledger_writer.flush()
+    gained = db.session.get(User, user_id).coins - START_COINS
+    assert gained > 0 and gained % (RECORD_REWARD + TOP_REWARD) == 0
+    assert gained // (RECORD_REWARD + TOP_REWARD) <= sum(len(ts) for ts in times)
+    assert db.session.query(func.sum(CoinLedger.delta)).filter_by(user_id=user_id).scalar() == gained
@@ -0,0 +1,62 @@
+import threading
+import time
+from datetime import datetime, timedelta, timezone
+from app.models import User, RevokedToken
+from app.utils.revocation import revocation_list
+from app.utils.token import generate_refresh_token, verify_token
+
+
+def rebuild_in_background(app):
+    # как в фоновом потоке: своя сессия, свой контекст приложения
+    def run():
+        with app.app_context():
+            revocation_list.rebuild()
+    thread = threading.Thread(target=run)
+    thread.start()
+    thread.join()
+
+
+def test_user_revocation_is_checked_without_queries(app, db, make_user, count_queries):
+    user_id, token = make_user('revoked')
+    verify_token(token)  # первая проверка запускает фоновую сборку и ждёт её
+
+    revocation_list.revoke_user(user_id, timedelta(days=1))
+    db.session.commit()
+    time.sleep(0.01)
+    _, fresh = make_user('bystander')
+
+    with app.test_request_context(), count_queries() as statements:
+        assert verify_token(token) == 'Token has been revoked'
+        assert isinstance(verify_token(fresh), dict)
+    assert statements == []
+
+
+def test_rebuild_picks_up_other_workers_and_keeps_local_revocations(app, db, make_user):
+    remote_id, remote_token = make_user('remote')
+    local_id, local_token = make_user('local')
+    time.sleep(0.01)
+
+    # отзыв из другого воркера виден только через БД
+    now = datetime.now(timezone.utc)
+    db.session.add(RevokedToken(key=f'user:{remote_id}', revoked_at=now, expires_at=now + timedelta(days=1)))
+    db.session.commit()
+    # а свой ещё не закоммичен, когда идёт пересборка
+    revocation_list.revoke_user(local_id, timedelta(days=1))
+    rebuild_in_background(app)
+    db.session.rollback()
+
+    with app.test_request_context():
+        assert verify_token(remote_token) == 'Token has been revoked'
+        assert verify_token(local_token) == 'Token has been revoked'
+
+
+def test_refresh_token_is_exchanged_only_once(app, db, make_user, run_concurrently):
+    user_id, _ = make_user('rotating')
+    refresh_token = generate_refresh_token(db.session.get(User, user_id))
+    threads_count = 4
+
+    responses = run_concurrently([[('POST', '/refresh', {'refresh_token': refresh_token}, None)]] * threads_count)
+
+    # одновременные запросы с одним токеном: новую пару получает ровно один, остальные — 401, а не 500
+    assert sorted(status for _, status, _ in responses) == [200] + [401] * (threads_count - 1)
+    assert all(body == {'message': 'Token has been revoked'} for _, status, body in responses if status == 401)
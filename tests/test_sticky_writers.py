@@ -0,0 +1,76 @@
+import datetime
+from sqlalchemy import create_engine, insert, select
+from app.models import Leaderboard, Difficulty
+from app.db_routing import StickyWriters, sticky_writers, REPLICA_PREFIX, STICKY_COOKIE, STICKY_HEADER
+
+
+def test_write_hands_sticky_deadline_to_client(app, db, make_user):
+    user_id, token = make_user('writer', coins=100)
+    client = app.test_client()
+
+    response = client.get('/open_mine', headers={'x-access-token': token})
+    assert response.status_code == 201
+    deadline = response.headers[STICKY_HEADER]
+    assert client.get_cookie(STICKY_COOKIE).value == deadline
+
+    # другой воркер ничего не знает о записи, но видит дедлайн из запроса
+    other_worker = StickyWriters(seconds=app.config['DB_STICKY_SECONDS'])
+    with app.test_request_context(headers={STICKY_HEADER: deadline}):
+        assert other_worker.is_sticky(user_id)
+    with app.test_request_context():
+        assert not other_worker.is_sticky(user_id)
+
+
+def test_read_does_not_set_sticky_deadline(app, db, make_user):
+    _, token = make_user('reader')
+    response = app.test_client().get('/get_coins', headers={'x-access-token': token})
+    assert response.status_code == 200
+    assert STICKY_HEADER not in response.headers
+
+
+def test_forged_deadline_is_bounded(app):
+    sticky = StickyWriters(seconds=5)
+    for value in ('nonsense', '0', '9999999999'):
+        with app.test_request_context(headers={STICKY_HEADER: value}):
+            assert not sticky.is_sticky(1)
+
+
+def _request(app, client, method, url, **kwargs):
+    # фикстура db держит контекст приложения, и запросы клиента делили бы с ней g;
+    # в воркере у каждого запроса свой g, поэтому и здесь даём каждому свой контекст
+    with app.app_context():
+        return client.open(url, method=method, **kwargs)
+
+
+def test_read_only_routes_use_replica_until_user_writes(app, db, make_user, tmp_path, monkeypatch):
+    user_id, token = make_user('replicated')
+    # реплика — отдельный файл SQLite, который «отстаёт»: в нём другое время того же игрока
+    replica = create_engine(f'sqlite:///{tmp_path / "replica.db"}')
+    db.metadata.create_all(replica)
+    row = {'created_at': datetime.datetime.now(), 'username': 'replicated', 'user_id': user_id, 'difficulty': Difficulty.easy}
+    with replica.begin() as connection:
+        connection.execute(insert(Leaderboard), [{**row, 'milliseconds': 7000}])
+    db.session.execute(insert(Leaderboard), [{**row, 'milliseconds': 8000}])
+    db.session.commit()
+    monkeypatch.setitem(db.engines, f'{REPLICA_PREFIX}0', replica)
+    monkeypatch.setattr(sticky_writers, '_deadlines', {})
+    headers = {'x-access-token': token}
+
+    try:
+        client = app.test_client()
+        response = _request(app, client, 'GET', '/get_personal_records', headers=headers)
+        assert response.get_json() == [{'milliseconds': 7000, 'difficulty': 'easy'}]
+
+        response = _request(app, client, 'POST', '/new_record', json={'milliseconds': 6000, 'difficulty': 'easy'}, headers=headers)
+        assert response.status_code in (200, 201)
+        # запись ушла на primary, реплику никто не трогал
+        assert db.session.execute(select(Leaderboard.milliseconds)).scalars().all() == [6000]
+        with replica.connect() as connection:
+            assert connection.execute(select(Leaderboard.milliseconds)).scalars().all() == [7000]
+
+        # после записи свою запись читаем с primary: и тем же клиентом, и новым в этом же воркере
+        for reader in (client, app.test_client()):
+            response = _request(app, reader, 'GET', '/get_personal_records', headers=headers)
+            assert response.get_json() == [{'milliseconds': 6000, 'difficulty': 'easy'}]
+    finally:
+        replica.dispose()